@@ -5,70 +5,178 @@ Supports: Slack, Email, SMS
 """
 
 import os
-import json
-import smtplib
-import subprocess
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import atexit
+import logging
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-import yaml
+import requests
+
+from config_loader import load_config
+
+# Child of the watchdog logger: alert output goes through its handler
+logger = logging.getLogger("watchdog.alerter")
+
+# Seconds an SMTP connect or command may block before the send fails
+SMTP_TIMEOUT = 15
+DEFAULT_SMTP_PORT = 587
+
+# Slack rejects the whole message (400 invalid_blocks) if a section field is longer
+SLACK_FIELD_LIMIT = 2000
+
+
+def _smtp_port(value):
+    """Parse SMTP_PORT; a bad value must not break installs that never email"""
+    if not value:
+        return DEFAULT_SMTP_PORT
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("  → Invalid SMTP_PORT %r; using %s", value, DEFAULT_SMTP_PORT)
+        return DEFAULT_SMTP_PORT
+
+
+# One exit hook for all alerters; weak refs so it doesn't keep them alive
+_live_alerters = weakref.WeakSet()
+
+
+@atexit.register
+def _shutdown_alerters():
+    """Finish in-flight sends, deliver queued Slack alerts and close SMTP before exit"""
+    for alerter in list(_live_alerters):
+        # Escalation sends still running after _dispatch's timeout finish here
+        alerter._io_pool.shutdown(wait=True)
+        alerter.flush()
+        with alerter._smtp_lock:
+            alerter._close_smtp()
 
 
 class Alerter:
     """Handle alerts via multiple channels"""
     
     def __init__(self, config_path):
-        with open(config_path) as f:
-            self.config = yaml.safe_load(f)
+        self.config = load_config(config_path)
         self.alert_config = self.config.get('alerts', {})
+        
+        # Resolve escalation settings once; they don't change per check
+        email_config = self.alert_config.get('email', {})
+        self.email_enabled = bool(email_config.get('enabled', True))
+        self.email_threshold = int(email_config.get('escalate_after', 3))
+        self.email_recipients = tuple(email_config.get('recipients', []))
+        
+        self.sms_config = self.alert_config.get('sms', {})
+        self.sms_enabled = bool(self.sms_config.get('enabled', False))
+        self.sms_threshold = int(self.sms_config.get('escalate_after', 5))
+        
+        # Slack sends are queued to a worker thread that owns the session,
+        # so the check loop never waits on Slack's round-trip
+        self._http = requests.Session()
+        self._slack_queue = queue.Queue(maxsize=1024)
+        self._slack_worker = None
+        self._slack_worker_lock = threading.Lock()
+        
+        # SMTP settings are read once rather than on every email
+        smtp_user = os.getenv('SMTP_USER')
+        self._smtp_conf = {
+            'host': os.getenv('SMTP_HOST'),
+            'port': _smtp_port(os.getenv('SMTP_PORT')),
+            'user': smtp_user,
+            'password': os.getenv('SMTP_PASSWORD'),
+            'from': os.getenv('EMAIL_FROM', smtp_user),
+        }
+        self._smtp = None
+        self._smtp_lock = threading.Lock()
+        
+        self._twilio_conf = {
+            'account_sid': os.getenv('TWILIO_ACCOUNT_SID'),
+            'auth_token': os.getenv('TWILIO_AUTH_TOKEN'),
+            'from_number': os.getenv('TWILIO_FROM_NUMBER'),
+            'messaging_service_sid': os.getenv('TWILIO_MESSAGING_SERVICE_SID'),
+        }
+        self._twilio_client = None
+        
+        # Channel sends are I/O-bound and independent of each other
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
+        
+        _live_alerters.add(self)
     
     def send_initial_alert(self, result):
         """Send initial failure alert"""
-        message = self._format_failure_message(result)
+        jobs = []
         
         # Always send to Slack first (immediate notification)
         if 'slack' in result.get('alert_channels', []):
-            self._send_slack(
+            # Raw fields: _send_slack renders only what its transport sends
+            jobs.append(('slack', self._send_slack, (
                 f"🚨 ALERT: {result['name']} is DOWN",
-                message,
-                color='danger'
-            )
+                None,
+                'danger',
+                self._failure_fields(result)
+            )))
+        
+        self._dispatch(jobs)
     
     def send_escalation_alert(self, result, incident, failure_count):
         """Send escalated alerts based on failure count"""
-        alert_config = self.alert_config
+        alert_channels = result.get('alert_channels', [])
+        jobs = []
         
         # Email escalation
-        email_config = alert_config.get('email', {})
-        email_threshold = email_config.get('escalate_after', 3)
-        
-        if (failure_count == email_threshold and 
-            'email' in result.get('alert_channels', []) and
-            email_config.get('enabled', True)):
-            
-            message = self._format_failure_message(result, failure_count)
-            self._send_email(
-                subject=f"🚨 ESCALATION: {result['name']} down for {failure_count} checks",
-                body=message,
-                recipients=email_config.get('recipients', [])
-            )
-            print(f"  → Email alert sent (escalation threshold reached)")
+        if (failure_count == self.email_threshold and 
+            'email' in alert_channels and
+            self.email_enabled):
+            
+            jobs.append(('email', self._send_email, (
+                f"🚨 ESCALATION: {result['name']} down for {failure_count} checks",
+                self._format_plain(result, failure_count),
+                list(self.email_recipients)
+            )))
         
         # SMS escalation
-        sms_config = alert_config.get('sms', {})
-        sms_threshold = sms_config.get('escalate_after', 5)
-        
-        if (failure_count == sms_threshold and 
-            'sms' in result.get('alert_channels', []) and
-            sms_config.get('enabled', False)):
+        if (failure_count == self.sms_threshold and 
+            'sms' in alert_channels and
+            self.sms_enabled):
             
             brief_message = f"CRITICAL: {result['name']} has been down for {failure_count} consecutive checks. {result.get('error_message', 'Unknown error')}"
-            self._send_sms(brief_message, sms_config)
-            print(f"  → SMS alert sent (critical threshold reached)")
+            jobs.append(('sms', self._send_sms, (brief_message, self.sms_config)))
+        
+        sent = self._dispatch(jobs)
+        if sent.get('email'):
+            logger.info("  → Email alert sent (escalation threshold reached)")
+        if sent.get('sms'):
+            logger.info("  → SMS alert sent (critical threshold reached)")
+    
+    def _dispatch(self, jobs, timeout=15):
+        """Run channel sends concurrently; returns {channel: sent}, None if unfinished"""
+        if len(jobs) <= 1:
+            return {channel: send(*args) for channel, send, args in jobs}
+        
+        # Wall time is the slowest channel, not the sum
+        futures = {channel: self._io_pool.submit(send, *args) for channel, send, args in jobs}
+        wait(futures.values(), timeout=timeout)
+        
+        sent = {}
+        for channel, future in futures.items():
+            if not future.done():
+                sent[channel] = None
+                if future.cancel():
+                    logger.warning("  → %s alert cancelled (not started after %ss)", channel, timeout)
+                else:
+                    # Left to finish on the pool; the exit hook waits for it
+                    logger.warning("  → %s alert still sending after %ss", channel, timeout)
+            elif future.exception() is not None:
+                sent[channel] = False
+                logger.error("  → %s alert error: %s", channel, future.exception())
+            else:
+                sent[channel] = future.result()
+        return sent
     
     def send_recovery_alert(self, result, incident):
         """Send recovery notification"""
-        downtime = incident['failure_count']
+        downtime = incident.failure_count
         message = f"✅ *RECOVERED*: {result['name']}\n\n"
         message += f"Target is now responding normally.\n"
         message += f"Was down for {downtime} consecutive checks.\n"
@@ -81,31 +189,138 @@ class Alerter:
                 color='good'
             )
     
-    def _format_failure_message(self, result, failure_count=1):
-        """Format failure message"""
-        msg = f"*Target*: {result['name']}\n"
-        msg += f"*Status*: {result['status'].upper()}\n"
+    def _failure_fields(self, result, failure_count=1):
+        """Label/value pairs describing a failure, shared by all formats"""
+        fields = [
+            ("Target", result['name']),
+            ("Status", result['status'].upper()),
+        ]
         
         if result.get('status_code'):
-            msg += f"*HTTP Status*: {result['status_code']}\n"
+            fields.append(("HTTP Status", result['status_code']))
         
         if result.get('error_message'):
-            msg += f"*Error*: {result['error_message']}\n"
+            fields.append(("Error", result['error_message']))
         
         if failure_count > 1:
-            msg += f"*Consecutive Failures*: {failure_count}\n"
+            fields.append(("Consecutive Failures", failure_count))
         
-        msg += f"*Time*: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        fields.append(("Time", datetime.now().isoformat(sep=' ', timespec='seconds')))
         
-        return msg
+        return fields
+    
+    @staticmethod
+    def _mrkdwn(fields):
+        """Render failure fields as Slack mrkdwn lines"""
+        return "\n".join(f"*{label}*: {value}" for label, value in fields)
+    
+    def _format_plain(self, result, failure_count=1):
+        """Format failure message as plain text for email"""
+        return "\n".join(
+            f"{label}: {value}" for label, value in self._failure_fields(result, failure_count)
+        )
     
-    def _send_slack(self, title, message, color='danger'):
-        """Send Slack notification"""
+    @staticmethod
+    def _blocks(fields):
+        """Render failure fields as a Slack Block Kit section"""
+        return [{
+            "type": "section",
+            "fields": [
+                {"type": "mrkdwn", "text": _truncate(f"*{label}*\n{value}", SLACK_FIELD_LIMIT)}
+                for label, value in fields
+            ]
+        }]
+    
+    def _format_slack_blocks(self, title, fields):
+        """Slack webhook payload: the title and failure fields as top-level blocks"""
+        return {
+            # Shown in notifications, where blocks aren't rendered
+            "text": title,
+            "blocks": [
+                {"type": "section", "text": {"type": "mrkdwn", "text": f"*{title}*"}},
+                *self._blocks(fields)
+            ]
+        }
+    
+    def _send_slack(self, title, message, color='danger', fields=None):
+        """Send Slack notification; fields, when given, are rendered per transport"""
         slack_config = self.alert_config.get('slack', {})
         
         if not slack_config.get('enabled', True):
             return
         
+        webhook_url = slack_config.get('webhook_url') or os.getenv('SLACK_WEBHOOK_URL')
+        
+        if slack_config.get('use_clawdbot') or not webhook_url:
+            if fields:
+                message = self._mrkdwn(fields)
+            self._enqueue_slack(self._send_slack_clawdbot, title, message, slack_config)
+            return
+        
+        if fields:
+            payload = self._format_slack_blocks(title, fields)
+        else:
+            payload = {
+                "text": f"*{title}*",
+                "attachments": [{"color": color, "text": message}]
+            }
+        
+        self._enqueue_slack(self._post_slack_webhook, webhook_url, payload)
+    
+    def _enqueue_slack(self, send, *args):
+        """Hand a Slack send to the background worker"""
+        self._start_slack_worker()
+        try:
+            self._slack_queue.put_nowait((send, args))
+        except queue.Full:
+            logger.warning("  → Slack alert dropped (send queue full)")
+    
+    def _start_slack_worker(self):
+        """Start the Slack worker thread on first use"""
+        if self._slack_worker is not None:
+            return
+        with self._slack_worker_lock:
+            if self._slack_worker is None:
+                # The worker holds only the queue, not the Alerter
+                self._slack_worker = threading.Thread(
+                    target=_drain_slack_queue,
+                    args=(self._slack_queue,),
+                    name='slack-alerts',
+                    daemon=True
+                )
+                self._slack_worker.start()
+    
+    def flush(self, timeout=15):
+        """Wait for queued Slack alerts to be sent; returns False on timeout"""
+        if self._slack_worker is None:
+            return True
+        
+        deadline = time.monotonic() + timeout
+        with self._slack_queue.all_tasks_done:
+            while self._slack_queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("  → %s Slack alert(s) not sent after %ss", self._slack_queue.unfinished_tasks, timeout)
+                    return False
+                self._slack_queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def _post_slack_webhook(self, webhook_url, payload):
+        """Post a Slack payload to an incoming webhook"""
+        # Reuse the session's keep-alive connection across alerts
+        try:
+            response = self._http.post(webhook_url, json=payload, timeout=10)
+            if response.status_code == 200:
+                logger.info("  → Slack alert sent")
+            else:
+                logger.error("  → Slack alert failed: %s", response.status_code)
+        except Exception as e:
+            logger.error("  → Slack alert error: %s", e)
+    
+    def _send_slack_clawdbot(self, title, message, slack_config):
+        """Send Slack notification via the clawdbot CLI"""
+        import subprocess
+        
         channel = slack_config.get('channel', '#alerts')
         
         # Try using Clawdbot message tool (via subprocess)
@@ -131,97 +346,194 @@ class Alerter:
             )
             
             if result.returncode == 0:
-                print(f"  → Slack alert sent to {channel}")
+                logger.info("  → Slack alert sent to %s", channel)
             else:
-                print(f"  → Slack alert failed: {result.stderr}")
+                logger.error("  → Slack alert failed: %s", result.stderr)
                 
         except Exception as e:
-            print(f"  → Slack alert error: {e}")
+            logger.error("  → Slack alert error: %s", e)
     
-    def _send_email(self, subject, body, recipients):
-        """Send email via SMTP"""
-        smtp_host = os.getenv('SMTP_HOST')
-        smtp_port = int(os.getenv('SMTP_PORT', 587))
-        smtp_user = os.getenv('SMTP_USER')
-        smtp_pass = os.getenv('SMTP_PASSWORD')
-        from_email = os.getenv('EMAIL_FROM', smtp_user)
+    def _send_email(self, subject, body, recipients, html_body=None):
+        """Send email via SMTP (multipart only when an HTML body is given); True if sent"""
+        from email.message import EmailMessage
         
-        if not all([smtp_host, smtp_user, smtp_pass]):
-            print("  → Email alert skipped (SMTP not configured)")
-            return
+        conf = self._smtp_conf
+        
+        if not all([conf['host'], conf['user'], conf['password']]):
+            logger.info("  → Email alert skipped (SMTP not configured)")
+            return False
         
         try:
-            msg = MIMEMultipart()
-            msg['From'] = from_email
+            msg = EmailMessage()
+            msg['From'] = conf['from']
             msg['To'] = ', '.join(recipients)
             msg['Subject'] = subject
             
-            msg.attach(MIMEText(body, 'plain'))
+            msg.set_content(body)
+            if html_body:
+                msg.add_alternative(html_body, subtype='html')
             
-            server = smtplib.SMTP(smtp_host, smtp_port)
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.send_message(msg)
-            server.quit()
+            # Channels may send concurrently; one SMTP session at a time
+            with self._smtp_lock:
+                try:
+                    server = self._get_smtp()
+                    server.send_message(msg)
+                except Exception:
+                    # Drop the connection (still under the lock, so never one
+                    # another thread is using) so the next email starts fresh
+                    self._close_smtp()
+                    raise
             
-            print(f"  → Email sent to {', '.join(recipients)}")
+            logger.info("  → Email sent to %s", ', '.join(recipients))
+            return True
             
         except Exception as e:
-            print(f"  → Email error: {e}")
+            logger.error("  → Email error: %s", e)
+            return False
+    
+    def _get_smtp(self):
+        """Return an authenticated SMTP connection, reusing the open one if alive"""
+        import smtplib
+        
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp()
+        
+        conf = self._smtp_conf
+        server = smtplib.SMTP(conf['host'], conf['port'], timeout=SMTP_TIMEOUT)
+        server.starttls()
+        server.login(conf['user'], conf['password'])
+        
+        self._smtp = server
+        return server
+    
+    def _close_smtp(self):
+        """Close the cached SMTP connection, if any"""
+        if self._smtp is None:
+            return
+        
+        import smtplib
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
     
     def _send_sms(self, message, sms_config):
-        """Send SMS via Twilio or email gateway"""
+        """Send SMS via Twilio or email gateway; True if any recipient was sent to"""
         method = sms_config.get('method', 'email_gateway')
         
         if method == 'twilio':
-            self._send_sms_twilio(message, sms_config)
-        else:
-            self._send_sms_email_gateway(message, sms_config)
+            return self._send_sms_twilio(message, sms_config)
+        return self._send_sms_email_gateway(message, sms_config)
     
     def _send_sms_twilio(self, message, sms_config):
         """Send SMS via Twilio API"""
         try:
-            from twilio.rest import Client
+            conf = self._twilio_conf
+            messaging_service_sid = (
+                sms_config.get('messaging_service_sid') or conf['messaging_service_sid']
+            )
             
-            account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-            auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-            from_number = os.getenv('TWILIO_FROM_NUMBER')
+            if not (conf['account_sid'] and conf['auth_token'] and
+                    (messaging_service_sid or conf['from_number'])):
+                logger.info("  → SMS skipped (Twilio not configured)")
+                return False
             
-            if not all([account_sid, auth_token, from_number]):
-                print("  → SMS skipped (Twilio not configured)")
-                return
+            client = self._get_twilio_client()
+            recipients = sms_config.get('recipients', [])
             
-            client = Client(account_sid, auth_token)
+            if not recipients:
+                logger.info("  → SMS skipped (no recipients configured)")
+                return False
             
-            for recipient in sms_config.get('recipients', []):
-                client.messages.create(
-                    body=message,
-                    from_=from_number,
-                    to=recipient
-                )
+            # A messaging service picks the sender number on Twilio's side
+            if messaging_service_sid:
+                sender = {'messaging_service_sid': messaging_service_sid}
+            else:
+                sender = {'from_': conf['from_number']}
             
-            print(f"  → SMS sent via Twilio")
+            def send(recipient):
+                client.messages.create(body=message, to=recipient, **sender)
+            
+            # Twilio's client is blocking; send to all recipients concurrently
+            with ThreadPoolExecutor(max_workers=min(8, len(recipients))) as executor:
+                futures = {executor.submit(send, to): to for to in recipients}
+            
+            failed = 0
+            for future, recipient in futures.items():
+                if future.exception() is not None:
+                    failed += 1
+                    logger.error("  → SMS to %s failed: %s", recipient, future.exception())
+            
+            logger.info("  → SMS sent via Twilio (%s/%s)", len(recipients) - failed, len(recipients))
+            return failed < len(recipients)
             
         except ImportError:
-            print("  → SMS error: twilio package not installed (pip install twilio)")
+            logger.error("  → SMS error: twilio package not installed (pip install twilio)")
         except Exception as e:
-            print(f"  → SMS error: {e}")
+            logger.error("  → SMS error: %s", e)
+        return False
+    
+    def _get_twilio_client(self):
+        """Return the Twilio client, creating it with a pooled keep-alive session"""
+        if self._twilio_client is None:
+            from twilio.rest import Client
+            from requests.adapters import HTTPAdapter
+            
+            conf = self._twilio_conf
+            client = Client(conf['account_sid'], conf['auth_token'])
+            
+            # Size the pool for the concurrent per-recipient sends
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount('https://', adapter)
+            client.http_client.session = session
+            
+            self._twilio_client = client
+        return self._twilio_client
     
     def _send_sms_email_gateway(self, message, sms_config):
         """Send SMS via email-to-SMS gateway (simpler, no API needed)"""
         gateway = os.getenv('SMS_EMAIL_GATEWAY')
         
         if not gateway:
-            print("  → SMS skipped (SMS_EMAIL_GATEWAY not configured)")
-            return
+            logger.info("  → SMS skipped (SMS_EMAIL_GATEWAY not configured)")
+            return False
         
         # Send via SMTP to email-to-SMS gateway
-        self._send_email(
+        sent = self._send_email(
             subject="Watchdog Alert",
             body=message[:160],  # SMS limit
             recipients=[gateway]
         )
-        print(f"  → SMS sent via email gateway")
+        if sent:
+            logger.info("  → SMS sent via email gateway")
+        return sent
+
+
+def _truncate(text, limit):
+    """Cut text to at most limit characters, marking the cut with an ellipsis"""
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _drain_slack_queue(slack_queue):
+    """Worker loop: send queued Slack alerts one at a time"""
+    while True:
+        send, args = slack_queue.get()
+        try:
+            send(*args)
+        except Exception as e:
+            # One bad send must not kill the only worker
+            logger.error("  → Slack error: %s", e)
+        finally:
+            # Don't keep the last alert's Alerter alive while idle
+            send = args = None
+            slack_queue.task_done()
 
 
 if __name__ == "__main__":
@@ -229,6 +541,7 @@ if __name__ == "__main__":
     from pathlib import Path
     config_path = Path(__file__).parent / "config" / "targets.yaml"
     
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     alerter = Alerter(config_path)
     
     test_result = {
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Config Loader - Shared YAML config parsing
+Caches parsed configs in memory and as a JSON sidecar next to the YAML
+"""
+
+import os
+import copy
+import json
+import stat
+import tempfile
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Parsed configs keyed by absolute path, as ((mtime in ns, size), config);
+# an edited file replaces its entry rather than adding another
+_YAML_CACHE = {}
+
+
+def load_config(config_path):
+    """Load YAML config, reusing the parse while the file is unchanged
+    
+    Each call returns its own deep copy, so callers may modify it freely.
+    """
+    path = os.path.abspath(os.fspath(config_path))
+    st = os.stat(path)
+    # Exact match, not "newer than": deploys may preserve an older mtime
+    source = (st.st_mtime_ns, st.st_size)
+    
+    cached = _YAML_CACHE.get(path)
+    if cached is not None and cached[0] == source:
+        return copy.deepcopy(cached[1])
+    
+    config = _read_sidecar(path, source)
+    if config is None:
+        with open(path) as f:
+            config = yaml.load(f, Loader=SafeLoader) or {}
+        _write_sidecar(path, source, config, stat.S_IMODE(st.st_mode))
+    _YAML_CACHE[path] = (source, config)
+    
+    return copy.deepcopy(config)
+
+
+def _read_sidecar(path, source):
+    """Read the JSON copy of a config if it was made from this exact YAML file"""
+    sidecar = path + '.cache.json'
+    try:
+        with open(sidecar) as f:
+            cached = json.load(f)
+        if (cached['mtime_ns'], cached['size']) != source:
+            return None
+        return cached['config']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_sidecar(path, source, config, mode):
+    """Atomically write a JSON copy of a parsed config next to the YAML"""
+    sidecar = path + '.cache.json'
+    try:
+        data = json.dumps(
+            {'mtime_ns': source[0], 'size': source[1], 'config': config},
+            separators=(',', ':')
+        )
+        # JSON stringifies non-string keys (200 -> '200', True -> 'true');
+        # only cache configs that come back exactly as parsed
+        if json.loads(data)['config'] != config:
+            return
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            # mkstemp creates 0600; readers of the YAML should read the copy too
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, sidecar)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except (OSError, TypeError, ValueError):
+        # Read-only config dir or non-JSON values; the in-memory cache still applies
+        pass
@@ -45,5 +45,8 @@ CREATE TABLE IF NOT EXISTS incidents (
 
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_checks_target_timestamp ON checks(target_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_checks_timestamp ON checks(timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents(status, target_id);
+-- Open-incident lookup per target (get_open_incident); only open rows are indexed
+CREATE INDEX IF NOT EXISTS idx_incidents_open ON incidents(target_id, started_at DESC) WHERE status = 'open';
 CREATE INDEX IF NOT EXISTS idx_targets_enabled ON targets(enabled);
@@ -7,22 +7,44 @@ View current incidents, recent checks, and statistics
 import sqlite3
 import sys
 from pathlib import Path
-from datetime import datetime, timedelta
-from tabulate import tabulate
+from datetime import datetime, timedelta, timezone
 
 PROJECT_ROOT = Path(__file__).parent
 DB_PATH = PROJECT_ROOT / "db" / "watchdog.db"
 
+OK = "✓"
+FAIL = "✗"
 
-def connect_db():
-    conn = sqlite3.connect(DB_PATH)
+# Above this many rows, skip tabulate's per-cell width scans
+PLAIN_TABLE_THRESHOLD = 200
+
+
+def connect_db(db_path=DB_PATH):
+    """Open a read-only connection; main() shares one across all the views"""
+    conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("PRAGMA mmap_size = 268435456")
     return conn
 
 
-def show_incidents():
+def _print_plain(rows, headers):
+    """Print a simple aligned table without tabulate"""
+    rows = [[str(cell) for cell in row] for row in rows]
+    columns = list(zip(*rows)) or [()] * len(headers)
+    widths = [max([len(header), *map(len, column)]) for header, column in zip(headers, columns)]
+    template = "  ".join(f"{{:<{width}}}" for width in widths)
+    
+    lines = [
+        template.format(*headers),
+        "  ".join("-" * width for width in widths),
+    ]
+    lines.extend(template.format(*row) for row in rows)
+    print("\n".join(line.rstrip() for line in lines))
+
+
+def show_incidents(conn):
     """Show active incidents"""
-    conn = connect_db()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -49,9 +71,10 @@ def show_incidents():
         print()
 
 
-def show_recent_checks(limit=20):
+def show_recent_checks(conn, limit=20):
     """Show recent check history"""
-    conn = connect_db()
+    from tabulate import tabulate
+    
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -66,57 +89,61 @@ def show_recent_checks(limit=20):
     
     print(f"\n📊 Recent Checks (last {limit}):\n")
     
-    table = []
-    for check in checks:
-        status_icon = "✓" if check['status'] == 'success' else "✗"
-        response_time = f"{check['response_time']:.0f}ms" if check['response_time'] else "-"
-        
-        table.append([
+    table = [
+        (
             check['timestamp'],
-            f"{status_icon} {check['name']}",
+            f"{OK if check['status'] == 'success' else FAIL} {check['name']}",
             check['status'],
             check['status_code'] or '-',
-            response_time,
+            f"{check['response_time']:.0f}ms" if check['response_time'] else "-",
             check['error_message'] or '-'
-        ])
+        )
+        for check in checks
+    ]
     
-    print(tabulate(table, headers=['Time', 'Target', 'Status', 'Code', 'Time', 'Error']))
+    headers = ['Time', 'Target', 'Status', 'Code', 'Time', 'Error']
+    if limit > PLAIN_TABLE_THRESHOLD:
+        _print_plain(table, headers)
+    else:
+        print(tabulate(table, headers=headers))
     print()
 
 
-def show_stats():
+def show_stats(conn):
     """Show overall statistics"""
-    conn = connect_db()
+    from tabulate import tabulate
+    
     cursor = conn.cursor()
     
-    # Uptime stats (last 24 hours)
+    # Uptime stats (last 24 hours). Timestamps are stored as UTC text, so a
+    # constant cutoff lets SQLite range-scan idx_checks_timestamp.
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S')
     cursor.execute("""
         SELECT 
             t.name,
             COUNT(*) as total_checks,
             SUM(CASE WHEN c.status = 'success' THEN 1 ELSE 0 END) as successful,
-            AVG(CASE WHEN c.status = 'success' THEN c.response_time ELSE NULL END) as avg_response
+            ROUND(SUM(CASE WHEN c.status = 'success' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 1) as uptime_pct,
+            AVG(c.response_time) FILTER (WHERE c.status = 'success') as avg_response
         FROM checks c
         JOIN targets t ON c.target_id = t.id
-        WHERE c.timestamp > datetime('now', '-24 hours')
+        WHERE c.timestamp > ?
         GROUP BY t.id, t.name
-    """)
+    """, (cutoff,))
     
     stats = cursor.fetchall()
     
     print("\n📈 24-Hour Statistics:\n")
     
-    table = []
-    for stat in stats:
-        uptime = (stat['successful'] / stat['total_checks'] * 100) if stat['total_checks'] > 0 else 0
-        avg_ms = f"{stat['avg_response']:.0f}ms" if stat['avg_response'] else "-"
-        
-        table.append([
+    table = [
+        [
             stat['name'],
-            f"{uptime:.1f}%",
+            f"{stat['uptime_pct']:.1f}%",
             f"{stat['successful']}/{stat['total_checks']}",
-            avg_ms
-        ])
+            f"{stat['avg_response']:.0f}ms" if stat['avg_response'] else "-"
+        ]
+        for stat in stats
+    ]
     
     print(tabulate(table, headers=['Target', 'Uptime', 'Success/Total', 'Avg Response']))
     print()
@@ -128,21 +155,25 @@ def main():
         sys.exit(1)
     
     command = sys.argv[1] if len(sys.argv) > 1 else "all"
-    
-    if command == "incidents":
-        show_incidents()
-    elif command == "checks":
-        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
-        show_recent_checks(limit)
-    elif command == "stats":
-        show_stats()
-    elif command == "all":
-        show_incidents()
-        show_stats()
-        show_recent_checks(10)
-    else:
-        print("Usage: status.py [all|incidents|checks|stats]")
-        sys.exit(1)
+    conn = connect_db(DB_PATH)
+    
+    try:
+        if command == "incidents":
+            show_incidents(conn)
+        elif command == "checks":
+            limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+            show_recent_checks(conn, limit)
+        elif command == "stats":
+            show_stats(conn)
+        elif command == "all":
+            show_incidents(conn)
+            show_stats(conn)
+            show_recent_checks(conn, 10)
+        else:
+            print("Usage: status.py [all|incidents|checks|stats]")
+            sys.exit(1)
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
@@ -5,45 +5,60 @@ Tests database, checking, alerting, and incident management
 """
 
 import pytest
+import logging
 import sqlite3
 import json
 import tempfile
 import os
+import uuid
 from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock, call
+from unittest.mock import Mock, AsyncMock, patch, MagicMock, call
 from datetime import datetime
 
 # Import modules to test
 import sys
 sys.path.insert(0, str(Path(__file__).parent))
 
+import watchdog as watchdog_module
 from watchdog import WatchdogDB, Watchdog
 from alerter import Alerter
+import status
 
 
 # ============================================================================
 # FIXTURES
 # ============================================================================
 
-@pytest.fixture
-def temp_db():
-    """Create temporary database for testing"""
-    fd, path = tempfile.mkstemp(suffix='.db')
-    os.close(fd)
-    
-    db = WatchdogDB(path)
+@pytest.fixture(scope='session')
+def schema_db():
+    """Build the schema once per session as a template database"""
+    db = WatchdogDB(':memory:')
     db.connect()
     db.init_schema()
     
     yield db
     
     db.conn.close()
-    os.unlink(path)
 
 
 @pytest.fixture
+def temp_db(schema_db):
+    """Create temporary database for testing"""
+    # Named shared-cache memory DB: other connections to db_path see the same data
+    db = WatchdogDB(f"file:watchdog-{uuid.uuid4().hex}?mode=memory&cache=shared")
+    db.connect()
+    
+    # Page-level copy of the initialized schema
+    schema_db.conn.backup(db.conn)
+    
+    yield db
+    
+    db.conn.close()
+
+
+@pytest.fixture(scope='session')
 def temp_config():
-    """Create temporary config file"""
+    """Create temporary config file (static, shared by all tests)"""
     fd, path = tempfile.mkstemp(suffix='.yaml')
     
     config_content = """
@@ -88,12 +103,16 @@ alerts:
     yield path
     
     os.unlink(path)
+    if os.path.exists(path + '.cache.json'):
+        os.unlink(path + '.cache.json')
 
 
 @pytest.fixture
 def mock_requests():
     """Mock requests library"""
     with patch('watchdog.requests') as mock:
+        # Watchdog requests go through its Session; route them to mock.request
+        mock.Session.return_value.request = mock.request
         yield mock
 
 
@@ -123,6 +142,75 @@ class TestWatchdogDB:
         assert 'checks' in tables
         assert 'incidents' in tables
     
+    def test_checks_timestamp_index_used(self, temp_db):
+        """Test time-window queries on checks use the timestamp index"""
+        cursor = temp_db.conn.cursor()
+        cursor.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM checks WHERE timestamp > ?",
+            ('2024-01-01 00:00:00',)
+        )
+        plan = ' '.join(row[3] for row in cursor.fetchall())
+        
+        assert 'idx_checks_timestamp' in plan
+    
+    def test_connect_uses_wal(self, tmp_path):
+        """Test on-disk databases are opened in WAL mode"""
+        db = WatchdogDB(tmp_path / 'watchdog.db')
+        db.connect()
+        
+        assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert db.conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        
+        db.conn.close()
+    
+    def test_connect_upgrades_older_schema(self, tmp_path):
+        """Test connecting adds indexes missing from databases made by an older init"""
+        db_path = tmp_path / 'watchdog.db'
+        db = WatchdogDB(db_path)
+        db.connect()
+        db.init_schema()
+        # Baseline schema: tables only, without the indexes added since,
+        # and no schema version recorded
+        db.conn.executescript("""
+            DROP INDEX idx_checks_timestamp;
+            DROP INDEX idx_incidents_open;
+            PRAGMA user_version = 0;
+        """)
+        db.conn.execute("INSERT INTO targets (name, url) VALUES ('Existing', 'https://example.com')")
+        db.conn.close()
+        
+        db.connect()
+        
+        plan = ' '.join(row[3] for row in db.conn.execute("""
+            EXPLAIN QUERY PLAN
+            DELETE FROM checks WHERE timestamp < datetime('now', '-30 days')
+        """))
+        assert 'idx_checks_timestamp' in plan
+        indexes = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_incidents_open' in indexes
+        
+        # Existing rows (and target ids) are untouched
+        assert [tuple(row) for row in db.conn.execute("SELECT id, name FROM targets")] == [(1, 'Existing')]
+        
+        db.conn.close()
+    
+    def test_connect_skips_current_schema(self, tmp_path):
+        """Test the schema script only runs when the stored version is behind"""
+        db = WatchdogDB(tmp_path / 'watchdog.db')
+        db.connect()
+        db.init_schema()
+        db.conn.close()
+        
+        with patch.object(WatchdogDB, '_apply_schema') as apply_schema:
+            db.connect()
+            db.init_schema()
+        
+        apply_schema.assert_not_called()
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == watchdog_module.SCHEMA_VERSION
+        
+        db.conn.close()
+    
     def test_load_targets_from_config(self, temp_db, temp_config):
         """Test loading targets from YAML config"""
         temp_db.load_targets_from_config(temp_config)
@@ -131,16 +219,36 @@ class TestWatchdogDB:
         assert len(targets) == 2
         
         target1 = targets[0]
-        assert target1['name'] == 'Test Service'
-        assert target1['url'] == 'https://example.com/api/health'
-        assert target1['expected_status'] == 200
-        assert json.loads(target1['alert_channels']) == ['slack', 'email']
+        assert target1.name == 'Test Service'
+        assert target1.url == 'https://example.com/api/health'
+        assert target1.expected_status == 200
+        assert target1.alert_channels == ['slack', 'email']
+    
+    def test_get_active_targets_compiles_contains(self, temp_db, temp_config):
+        """Test content markers are encoded once when targets are loaded"""
+        temp_db.load_targets_from_config(temp_config)
+        temp_db.conn.execute("UPDATE targets SET contains = 'héalthy' WHERE name = 'Test Service'")
+        temp_db.conn.commit()
+        
+        target1, target2 = temp_db.get_active_targets()
+        assert target1.contains_bytes == 'héalthy'.encode('utf-8')
+        assert target2.contains_bytes is None
+    
+    def test_load_targets_shares_parsed_config(self, temp_db, temp_config):
+        """Test targets reuse the config already parsed for the alerter"""
+        Alerter(temp_config)
+        
+        with patch('config_loader.yaml.load') as mock_load:
+            temp_db.load_targets_from_config(temp_config)
+            assert not mock_load.called
+        
+        assert len(temp_db.get_active_targets()) == 2
     
     def test_record_check_success(self, temp_db, temp_config):
         """Test recording successful check"""
         temp_db.load_targets_from_config(temp_config)
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         check_id = temp_db.record_check(
             target_id=target_id,
@@ -165,7 +273,7 @@ class TestWatchdogDB:
         """Test recording failed check"""
         temp_db.load_targets_from_config(temp_config)
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         check_id = temp_db.record_check(
             target_id=target_id,
@@ -187,7 +295,7 @@ class TestWatchdogDB:
         """Test creating new incident"""
         temp_db.load_targets_from_config(temp_config)
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         check_id = temp_db.record_check(target_id, 'failure', 500)
         incident_id = temp_db.create_incident(target_id, check_id)
@@ -207,7 +315,7 @@ class TestWatchdogDB:
         """Test updating incident with new failure"""
         temp_db.load_targets_from_config(temp_config)
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         check_id1 = temp_db.record_check(target_id, 'failure', 500)
         incident_id = temp_db.create_incident(target_id, check_id1)
@@ -222,11 +330,51 @@ class TestWatchdogDB:
         assert incident['failure_count'] == 2
         assert incident['last_check_id'] == check_id2
     
+    def test_increment_open_incident(self, temp_db, temp_config):
+        """Test failures are added to the open incident in one statement"""
+        temp_db.load_targets_from_config(temp_config)
+        targets = temp_db.get_active_targets()
+        target_id = targets[0].id
+        
+        # No open incident yet
+        check_id1 = temp_db.record_check(target_id, 'failure', 500)
+        assert temp_db.increment_open_incident(target_id, check_id1) is None
+        
+        incident_id = temp_db.create_incident(target_id, check_id1)
+        check_id2 = temp_db.record_check(target_id, 'failure', 500)
+        incident = temp_db.increment_open_incident(target_id, check_id2)
+        
+        assert incident.id == incident_id
+        assert incident.failure_count == 2
+        assert incident.last_check_id == check_id2
+        
+        # Resolved incidents are left alone
+        temp_db.resolve_incident(incident_id)
+        assert temp_db.increment_open_incident(target_id, check_id2) is None
+    
+    def test_increment_open_incident_without_returning(self, temp_db, temp_config, monkeypatch):
+        """Test SQLite builds without RETURNING look the incident up first"""
+        monkeypatch.setattr(watchdog_module, '_HAS_RETURNING', False)
+        temp_db.load_targets_from_config(temp_config)
+        target_id = temp_db.get_active_targets()[0].id
+        
+        check_id1 = temp_db.record_check(target_id, 'failure', 500)
+        assert temp_db.increment_open_incident(target_id, check_id1) is None
+        
+        incident_id = temp_db.create_incident(target_id, check_id1)
+        check_id2 = temp_db.record_check(target_id, 'failure', 500)
+        incident = temp_db.increment_open_incident(target_id, check_id2)
+        
+        assert incident.id == incident_id
+        assert incident.failure_count == 2
+        assert incident.last_check_id == check_id2
+        assert temp_db.get_open_incident(target_id) == incident
+    
     def test_resolve_incident(self, temp_db, temp_config):
         """Test resolving incident"""
         temp_db.load_targets_from_config(temp_config)
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         check_id = temp_db.record_check(target_id, 'failure', 500)
         incident_id = temp_db.create_incident(target_id, check_id)
@@ -240,11 +388,45 @@ class TestWatchdogDB:
         assert incident['status'] == 'resolved'
         assert incident['resolved_at'] is not None
     
+    def test_batch_commits_once(self, tmp_path, temp_config):
+        """Test writes inside a batch are only visible after it exits"""
+        db = WatchdogDB(tmp_path / 'watchdog.db')
+        db.connect()
+        db.init_schema()
+        db.load_targets_from_config(temp_config)
+        target_id = db.get_active_targets()[0].id
+        
+        reader = sqlite3.connect(tmp_path / 'watchdog.db')
+        
+        with db.batch():
+            check_id = db.record_check(target_id, 'failure', 500)
+            db.create_incident(target_id, check_id)
+            assert reader.execute("SELECT COUNT(*) FROM checks").fetchone()[0] == 0
+        
+        assert reader.execute("SELECT COUNT(*) FROM checks").fetchone()[0] == 1
+        assert reader.execute("SELECT COUNT(*) FROM incidents").fetchone()[0] == 1
+        
+        reader.close()
+        db.conn.close()
+    
+    def test_batch_rolls_back_on_error(self, temp_db, temp_config):
+        """Test a failed batch leaves no partial writes behind"""
+        temp_db.load_targets_from_config(temp_config)
+        target_id = temp_db.get_active_targets()[0].id
+        
+        with pytest.raises(RuntimeError):
+            with temp_db.batch():
+                temp_db.record_check(target_id, 'failure', 500)
+                raise RuntimeError("cycle aborted")
+        
+        assert temp_db.conn.execute("SELECT COUNT(*) FROM checks").fetchone()[0] == 0
+        assert not temp_db.conn.in_transaction
+    
     def test_get_open_incident(self, temp_db, temp_config):
         """Test retrieving open incident"""
         temp_db.load_targets_from_config(temp_config)
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         # No incident initially
         incident = temp_db.get_open_incident(target_id)
@@ -257,8 +439,8 @@ class TestWatchdogDB:
         # Should find it now
         incident = temp_db.get_open_incident(target_id)
         assert incident is not None
-        assert incident['id'] == incident_id
-        assert incident['status'] == 'open'
+        assert incident.id == incident_id
+        assert incident.status == 'open'
         
         # Resolve it
         temp_db.resolve_incident(incident_id)
@@ -267,11 +449,58 @@ class TestWatchdogDB:
         incident = temp_db.get_open_incident(target_id)
         assert incident is None
     
+    def test_open_incident_lookup_uses_index(self, temp_db):
+        """Test the open-incident query is served by the partial index"""
+        cursor = temp_db.conn.cursor()
+        cursor.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT * FROM incidents 
+            WHERE target_id = ? AND status = 'open'
+            ORDER BY started_at DESC LIMIT 1
+        """, (1,))
+        plan = ' '.join(row[3] for row in cursor.fetchall())
+        
+        assert 'idx_incidents_open' in plan
+        assert 'TEMP B-TREE' not in plan
+    
+    def test_prune_checks(self, temp_db, temp_config):
+        """Test old checks are pruned except those an incident points at"""
+        temp_db.load_targets_from_config(temp_config)
+        target_id = temp_db.get_active_targets()[0].id
+        
+        old_id = temp_db.record_check(target_id, 'success', 200)
+        resolved_id = temp_db.record_check(target_id, 'failure', 500)
+        open_id = temp_db.record_check(target_id, 'failure', 500)
+        recent_id = temp_db.record_check(target_id, 'success', 200)
+        temp_db.resolve_incident(temp_db.create_incident(target_id, resolved_id))
+        temp_db.create_incident(target_id, open_id)
+        temp_db.conn.execute(
+            "UPDATE checks SET timestamp = datetime('now', '-31 days') WHERE id IN (?, ?, ?)",
+            (old_id, resolved_id, open_id)
+        )
+        
+        assert temp_db.prune_checks() == 1
+        
+        cursor = temp_db.conn.execute("SELECT id FROM checks ORDER BY id")
+        assert [row[0] for row in cursor.fetchall()] == [resolved_id, open_id, recent_id]
+        # No incident is left pointing at a deleted check
+        assert temp_db.conn.execute("PRAGMA foreign_key_check(incidents)").fetchall() == []
+    
+    def test_prune_checks_uses_timestamp_index(self, temp_db):
+        """Test the retention delete is a range scan, not a full table scan"""
+        cursor = temp_db.conn.execute("""
+            EXPLAIN QUERY PLAN
+            DELETE FROM checks WHERE timestamp < datetime('now', '-30 days')
+        """)
+        plan = ' '.join(row[3] for row in cursor.fetchall())
+        
+        assert 'idx_checks_timestamp' in plan
+    
     def test_mark_alert_sent(self, temp_db, temp_config):
         """Test marking alerts as sent"""
         temp_db.load_targets_from_config(temp_config)
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         check_id = temp_db.record_check(target_id, 'failure', 500)
         incident_id = temp_db.create_incident(target_id, check_id)
@@ -287,6 +516,11 @@ class TestWatchdogDB:
         assert incident['slack_alerted'] == 1
         assert incident['email_alerted'] == 1
         assert incident['sms_alerted'] == 0
+    
+    def test_mark_alert_sent_rejects_unknown_channel(self, temp_db):
+        """Test channel names are never interpolated into SQL"""
+        with pytest.raises(KeyError):
+            temp_db.mark_alert_sent(1, 'slack_alerted = 1; --')
 
 
 # ============================================================================
@@ -317,6 +551,143 @@ class TestWatchdogChecking:
         assert result['response_time'] > 0
         assert result['error_message'] is None
     
+    def test_check_target_large_body_not_read(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test status-only checks drop large or unsized bodies without reading them"""
+        temp_db.load_targets_from_config(temp_config)
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        watchdog.db = temp_db
+        
+        for headers in ({'Content-Length': str(10 * 1024 * 1024)}, {}):
+            mock_response = Mock(status_code=200, headers=headers)
+            mock_requests.request.return_value = mock_response
+            
+            result = watchdog.check_target(temp_db.get_active_targets()[0])
+            
+            assert result['status'] == 'success'
+            assert mock_requests.request.call_args[1]['stream'] is True
+            assert not mock_response.iter_content.called
+            mock_response.close.assert_called_once()
+    
+    def test_check_target_reuses_connection(self, temp_db, temp_config, mock_alerter):
+        """Test streamed checks return small-body connections to the pool"""
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        connections = []
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def setup(self):
+                connections.append(self.client_address)
+                super().setup()
+            
+            def do_GET(self):
+                body = b"<html>healthy" + b" " * 4096 + b"</html>"
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        
+        try:
+            temp_db.load_targets_from_config(temp_config)
+            url = f"http://127.0.0.1:{server.server_port}/"
+            temp_db.conn.execute("UPDATE targets SET url = ?", (url,))
+            # One status-only target, one whose marker matches in the first chunk
+            temp_db.conn.execute("UPDATE targets SET contains = 'healthy' WHERE name = 'Test Service'")
+            
+            watchdog = Watchdog(temp_db.db_path, temp_config)
+            watchdog.db = temp_db
+            
+            for _ in range(3):
+                for target in temp_db.get_active_targets():
+                    assert watchdog.check_target(target)['status'] == 'success'
+            
+            assert len(connections) == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+    
+    def test_check_target_reuses_session(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test every check goes through the watchdog's pooled session"""
+        temp_db.load_targets_from_config(temp_config)
+        
+        mock_requests.request.return_value = Mock(status_code=200, text="OK")
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        watchdog.db = temp_db
+        
+        for target in temp_db.get_active_targets():
+            watchdog.check_target(target)
+        
+        assert mock_requests.Session.call_count == 1
+        assert mock_requests.request.call_count == 2
+    
+    def test_watchdog_attaches_handler_when_logging_unconfigured(self, temp_db, temp_config):
+        """Test a Watchdog used outside main() still gets a stdout handler"""
+        logger = logging.getLogger('watchdog')
+        
+        try:
+            with patch.object(logger, 'handlers', []), \
+                 patch.object(logger, 'hasHandlers', return_value=False):
+                Watchdog(temp_db.db_path, temp_config)
+                
+                assert len(logger.handlers) == 1
+                assert isinstance(logger.handlers[0], watchdog_module.BufferedStreamHandler)
+                assert logger.level == logging.INFO
+        finally:
+            logger.setLevel(logging.NOTSET)
+    
+    def test_check_target_logs_one_line(self, temp_db, temp_config, mock_requests, mock_alerter, caplog):
+        """Test each check is reported as a single log record"""
+        import logging
+        temp_db.load_targets_from_config(temp_config)
+        
+        mock_requests.request.return_value = Mock(status_code=500)
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        watchdog.db = temp_db
+        
+        targets = temp_db.get_active_targets()
+        with caplog.at_level(logging.INFO, logger='watchdog'):
+            watchdog.check_target(targets[0])
+        
+        assert caplog.messages == ["Checking Test Service... ✗ FAIL (Expected 200, got 500)"]
+    
+    def test_run_checks_flushes_log_once(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test check output is written unflushed and flushed once per cycle"""
+        import io
+        from watchdog import BufferedStreamHandler, logger
+        temp_db.load_targets_from_config(temp_config)
+        mock_requests.request.return_value = Mock(status_code=500)
+        
+        stream = io.StringIO()
+        stream.flush = Mock()
+        handler = BufferedStreamHandler(stream)
+        logger.addHandler(handler)
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        
+        try:
+            watchdog = Watchdog(temp_db.db_path, temp_config)
+            watchdog.run_checks()
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+        
+        assert "Checking Test Service... ✗ FAIL" in stream.getvalue()
+        assert "=== Check complete ===" in stream.getvalue()
+        assert stream.flush.call_count == 1
+        
+        watchdog.db.conn.close()
+    
     def test_check_target_wrong_status_code(self, temp_db, temp_config, mock_requests, mock_alerter):
         """Test check with unexpected status code"""
         temp_db.load_targets_from_config(temp_config)
@@ -384,7 +755,7 @@ class TestWatchdogChecking:
         
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.text = "Status: healthy"
+        mock_response.iter_content.return_value = [b"Status: hea", b"lthy"]
         mock_requests.request.return_value = mock_response
         
         watchdog = Watchdog(temp_db.db_path, temp_config)
@@ -394,6 +765,159 @@ class TestWatchdogChecking:
         result = watchdog.check_target(targets[0])
         
         assert result['status'] == 'success'
+        assert mock_requests.request.call_args[1]['stream'] is True
+        assert mock_response.close.called
+    
+    def test_dns_cache_reuses_lookup(self):
+        """Test repeat lookups are served from the cache until the TTL expires"""
+        addresses = [(2, 1, 6, '', ('93.184.216.34', 443))]
+        watchdog_module._dns_cache.clear()
+        
+        with patch('watchdog._system_getaddrinfo', return_value=addresses) as lookup, \
+             patch('watchdog.time.monotonic', side_effect=[0, 30, 61]):
+            for _ in range(3):
+                assert watchdog_module._cached_getaddrinfo('example.com', 443) == addresses
+        
+        assert lookup.call_count == 2
+        watchdog_module._dns_cache.clear()
+    
+    def test_dns_cache_skips_failures(self):
+        """Test failed lookups are retried rather than cached"""
+        watchdog_module._dns_cache.clear()
+        
+        with patch('watchdog._system_getaddrinfo', side_effect=OSError("no such host")) as lookup:
+            for _ in range(2):
+                with pytest.raises(OSError):
+                    watchdog_module._cached_getaddrinfo('missing.invalid', 443)
+        
+        assert lookup.call_count == 2
+        assert not watchdog_module._dns_cache
+    
+    def test_dns_cache_single_lookup_for_concurrent_misses(self):
+        """Test threads resolving the same host at once share one lookup"""
+        import threading
+        addresses = [(2, 1, 6, '', ('93.184.216.34', 443))]
+        watchdog_module._dns_cache.clear()
+        started = threading.Event()
+        release = threading.Event()
+        
+        def lookup(*args):
+            started.set()
+            release.wait(5)
+            return addresses
+        
+        with patch('watchdog._system_getaddrinfo', side_effect=lookup) as system:
+            threads = [
+                threading.Thread(target=watchdog_module._cached_getaddrinfo, args=('example.com', 443))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            started.wait(5)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        
+        assert system.call_count == 1
+        assert not watchdog_module._dns_inflight
+        watchdog_module._dns_cache.clear()
+    
+    def test_dns_cache_scoped_to_check_session(self, temp_db, temp_config, mock_alerter):
+        """Test new check connections reuse a lookup without patching the socket module"""
+        import socket
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                # Force a new connection (and so a new resolve) per check
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        original = socket.getaddrinfo
+        watchdog_module._dns_cache.clear()
+        
+        try:
+            temp_db.load_targets_from_config(temp_config)
+            temp_db.conn.execute("UPDATE targets SET url = ?", (f"http://localhost:{server.server_port}/",))
+            
+            watchdog = Watchdog(temp_db.db_path, temp_config)
+            watchdog.db = temp_db
+            
+            with patch('watchdog._system_getaddrinfo', wraps=original) as system:
+                for _ in range(2):
+                    for target in temp_db.get_active_targets():
+                        assert watchdog.check_target(target)['status'] == 'success'
+            
+            assert system.call_count == 1
+            assert socket.getaddrinfo is original
+        finally:
+            server.shutdown()
+            server.server_close()
+            watchdog_module._dns_cache.clear()
+    
+    def test_dns_cache_hook_only_inside_check_adapter(self):
+        """Test urllib3 opens connections through the hook, which only caches for the check adapter"""
+        import urllib3.connection
+        
+        # urllib3 resolves the function through its util.connection module at call time
+        assert urllib3.connection.connection.create_connection is watchdog_module._create_connection
+        
+        with patch('watchdog._urllib3_create_connection') as create, \
+             patch('watchdog._cached_getaddrinfo') as cached:
+            watchdog_module._create_connection(('example.com', 80), 5)
+        
+        cached.assert_not_called()
+        create.assert_called_once_with(('example.com', 80), 5)
+    
+    def test_connection_error_names_urllib3_pool(self, temp_db, temp_config, mock_alerter):
+        """Test recorded connection errors keep urllib3's own class names"""
+        import socket
+        
+        # Bind then close to get a local port that refuses connections
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        watchdog_module._dns_cache.clear()
+        
+        try:
+            temp_db.load_targets_from_config(temp_config)
+            temp_db.conn.execute("UPDATE targets SET url = ?", (f"http://localhost:{port}/",))
+            
+            watchdog = Watchdog(temp_db.db_path, temp_config)
+            watchdog.db = temp_db
+            result = watchdog.check_target(temp_db.get_active_targets()[0])
+        finally:
+            watchdog_module._dns_cache.clear()
+        
+        assert result['status'] == 'error'
+        recorded = temp_db.conn.execute(
+            "SELECT error_message FROM checks WHERE id = ?", (result['check_id'],)
+        ).fetchone()[0]
+        assert f"HTTPConnectionPool(host='localhost', port={port})" in recorded
+        assert "HTTPConnection(host='localhost'" in recorded
+    
+    def test_body_scan_stops_at_match(self):
+        """Test content scan stops reading once the marker is found"""
+        def chunks():
+            yield b"<html>... heal"
+            yield b"thy ..."
+            raise AssertionError("read past the match")
+        
+        response = Mock()
+        response.iter_content.return_value = chunks()
+        
+        assert Watchdog._body_contains(response, b'healthy')
     
     def test_check_target_content_validation_failure(self, temp_db, temp_config, mock_requests, mock_alerter):
         """Test content validation - failure"""
@@ -406,7 +930,7 @@ class TestWatchdogChecking:
         
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.text = "Status: degraded"
+        mock_response.iter_content.return_value = [b"Status: ", b"degraded"]
         mock_requests.request.return_value = mock_response
         
         watchdog = Watchdog(temp_db.db_path, temp_config)
@@ -439,7 +963,7 @@ class TestIncidentManagement:
         watchdog.db = temp_db
         
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         # No incident initially
         incident = temp_db.get_open_incident(target_id)
@@ -452,7 +976,7 @@ class TestIncidentManagement:
         # Incident should be created
         incident = temp_db.get_open_incident(target_id)
         assert incident is not None
-        assert incident['failure_count'] == 1
+        assert incident.failure_count == 1
     
     def test_consecutive_failures_increment_count(self, temp_db, temp_config, mock_requests, mock_alerter):
         """Test that consecutive failures increment incident count"""
@@ -466,28 +990,28 @@ class TestIncidentManagement:
         watchdog.db = temp_db
         
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         # First failure
         result = watchdog.check_target(targets[0])
         watchdog.handle_result(result)
         
         incident = temp_db.get_open_incident(target_id)
-        assert incident['failure_count'] == 1
+        assert incident.failure_count == 1
         
         # Second failure
         result = watchdog.check_target(targets[0])
         watchdog.handle_result(result)
         
         incident = temp_db.get_open_incident(target_id)
-        assert incident['failure_count'] == 2
+        assert incident.failure_count == 2
         
         # Third failure
         result = watchdog.check_target(targets[0])
         watchdog.handle_result(result)
         
         incident = temp_db.get_open_incident(target_id)
-        assert incident['failure_count'] == 3
+        assert incident.failure_count == 3
     
     def test_recovery_resolves_incident(self, temp_db, temp_config, mock_requests, mock_alerter):
         """Test that success after failure resolves incident"""
@@ -497,7 +1021,7 @@ class TestIncidentManagement:
         watchdog.db = temp_db
         
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         # Fail
         mock_response = Mock()
@@ -541,7 +1065,7 @@ class TestAlerter:
             'response_time': 250.5
         }
         
-        message = alerter._format_failure_message(result)
+        message = alerter._mrkdwn(alerter._failure_fields(result))
         
         assert 'Test Service' in message
         assert '500' in message
@@ -558,13 +1082,128 @@ class TestAlerter:
             'error_message': 'Internal Server Error'
         }
         
-        message = alerter._format_failure_message(result, failure_count=5)
+        message = alerter._mrkdwn(alerter._failure_fields(result, failure_count=5))
         
         assert '*Consecutive Failures*: 5' in message
     
-    @patch('alerter.subprocess.run')
-    def test_send_slack(self, mock_run, temp_config):
-        """Test Slack alert sending"""
+    def test_format_plain(self, temp_config):
+        """Test plain-text failure message has no Slack markup"""
+        alerter = Alerter(temp_config)
+        
+        result = {
+            'name': 'Test Service',
+            'status': 'failure',
+            'status_code': 500,
+            'error_message': 'Internal Server Error'
+        }
+        
+        message = alerter._format_plain(result, failure_count=5)
+        
+        assert 'Target: Test Service' in message
+        assert 'Consecutive Failures: 5' in message
+        assert '*' not in message
+    
+    def test_send_slack(self, temp_config, monkeypatch):
+        """Test Slack alert sending via webhook"""
+        monkeypatch.setenv('SLACK_WEBHOOK_URL', 'https://hooks.slack.com/services/T/B/X')
+        
+        alerter = Alerter(temp_config)
+        alerter._http = MagicMock()
+        alerter._http.post.return_value = Mock(status_code=200)
+        
+        result = {
+            'name': 'Test Service',
+            'status': 'failure',
+            'status_code': 500,
+            'error_message': 'Internal Server Error',
+            'alert_channels': ['slack']
+        }
+        
+        with patch.object(alerter, '_failure_fields', wraps=alerter._failure_fields) as fields_spy, \
+             patch.object(alerter, '_mrkdwn') as mrkdwn:
+            alerter.send_initial_alert(result)
+            assert alerter.flush(timeout=5)
+        
+        # Fields are built once and only the webhook's blocks are rendered
+        assert fields_spy.call_count == 1
+        assert not mrkdwn.called
+        
+        # Verify webhook was posted through the shared session
+        assert alerter._http.post.called
+        url = alerter._http.post.call_args[0][0]
+        payload = alerter._http.post.call_args[1]['json']
+        assert url == 'https://hooks.slack.com/services/T/B/X'
+        assert 'Test Service' in payload['text']
+        assert 'attachments' not in payload
+        
+        # Top-level Block Kit: title section, then the failure fields
+        assert 'Test Service' in payload['blocks'][0]['text']['text']
+        fields = payload['blocks'][1]['fields']
+        assert {'type': 'mrkdwn', 'text': '*HTTP Status*\n500'} in fields
+    
+    def test_slack_block_fields_truncated(self, temp_config):
+        """Test long field values are cut to Slack's per-field limit"""
+        from alerter import SLACK_FIELD_LIMIT
+        alerter = Alerter(temp_config)
+        
+        payload = alerter._format_slack_blocks("Down", [("Error", "x" * 5000), ("Target", "API")])
+        fields = payload['blocks'][1]['fields']
+        
+        assert len(fields[0]['text']) == SLACK_FIELD_LIMIT
+        assert fields[0]['text'].endswith('…')
+        assert fields[1]['text'] == '*Target*\nAPI'
+    
+    def test_send_slack_does_not_block(self, temp_config, monkeypatch):
+        """Test Slack webhook posts happen off the caller's thread"""
+        import threading
+        monkeypatch.setenv('SLACK_WEBHOOK_URL', 'https://hooks.slack.com/services/T/B/X')
+        
+        release = threading.Event()
+        alerter = Alerter(temp_config)
+        alerter._http = MagicMock()
+        alerter._http.post.side_effect = lambda *args, **kwargs: release.wait(5) and Mock(status_code=200)
+        
+        alerter._send_slack('Title', 'Message')
+        
+        # Caller returns while the post is still in flight
+        assert not alerter.flush(timeout=0.05)
+        
+        release.set()
+        assert alerter.flush(timeout=5)
+        assert alerter._http.post.call_count == 1
+    
+    def test_slack_worker_survives_failed_send(self, temp_config):
+        """Test an exception in one Slack send doesn't stop later ones"""
+        alerter = Alerter(temp_config)
+        sent = []
+        
+        def broken():
+            raise RuntimeError("boom")
+        
+        alerter._enqueue_slack(broken)
+        alerter._enqueue_slack(sent.append, 'second')
+        
+        assert alerter.flush(timeout=5)
+        assert sent == ['second']
+    
+    def test_alerter_not_kept_alive_by_slack_worker(self, temp_config):
+        """Test the worker thread and exit hook don't pin a used Alerter in memory"""
+        import gc
+        import weakref
+        alerter = Alerter(temp_config)
+        alerter._enqueue_slack(alerter._close_smtp)
+        assert alerter.flush(timeout=5)
+        
+        ref = weakref.ref(alerter)
+        del alerter
+        gc.collect()
+        
+        assert ref() is None
+    
+    @patch('subprocess.run')
+    def test_send_slack_clawdbot_fallback(self, mock_run, temp_config, monkeypatch):
+        """Test Slack alert falls back to clawdbot without a webhook"""
+        monkeypatch.delenv('SLACK_WEBHOOK_URL', raising=False)
         mock_run.return_value = Mock(returncode=0, stderr='')
         
         alerter = Alerter(temp_config)
@@ -578,14 +1217,16 @@ class TestAlerter:
         }
         
         alerter.send_initial_alert(result)
+        assert alerter.flush(timeout=5)
         
         # Verify subprocess.run was called with clawdbot command
         assert mock_run.called
         call_args = mock_run.call_args[0][0]
         assert 'clawdbot' in call_args
-        assert 'message' in call_args
+        assert '#test-alerts' in call_args
+        assert '*HTTP Status*: 500' in call_args[-1]
     
-    @patch('alerter.smtplib.SMTP')
+    @patch('smtplib.SMTP')
     def test_send_email(self, mock_smtp, temp_config, monkeypatch):
         """Test email alert sending"""
         # Set environment variables
@@ -606,11 +1247,124 @@ class TestAlerter:
         )
         
         # Verify SMTP operations
+        mock_smtp.assert_called_once_with('smtp.test.com', 587, timeout=15)
         assert mock_server.starttls.called
         assert mock_server.login.called
         assert mock_server.send_message.called
+        
+        # Connection is kept open for the next alert
+        assert not mock_server.quit.called
+        
+        # Plain-text body is sent as a single part
+        msg = mock_server.send_message.call_args[0][0]
+        assert not msg.is_multipart()
+        assert msg.get_content().strip() == 'Test message'
+        assert msg['To'] == 'recipient@test.com'
+    
+    def test_invalid_smtp_port_falls_back(self, temp_config, monkeypatch):
+        """Test a malformed SMTP_PORT doesn't stop the alerter from loading"""
+        monkeypatch.setenv('SMTP_PORT', 'smtp')
+        
+        alerter = Alerter(temp_config)
+        
+        assert alerter._smtp_conf['port'] == 587
+    
+    @patch('smtplib.SMTP')
+    def test_send_email_reuses_connection(self, mock_smtp, temp_config, monkeypatch):
+        """Test consecutive emails share one authenticated SMTP session"""
+        monkeypatch.setenv('SMTP_HOST', 'smtp.test.com')
+        monkeypatch.setenv('SMTP_USER', 'test@test.com')
+        monkeypatch.setenv('SMTP_PASSWORD', 'password')
+        
+        mock_server = MagicMock()
+        mock_server.noop.return_value = (250, b'OK')
+        mock_smtp.return_value = mock_server
+        
+        alerter = Alerter(temp_config)
+        
+        for _ in range(3):
+            alerter._send_email('Test Alert', 'Test message', ['recipient@test.com'])
+        
+        assert mock_smtp.call_count == 1
+        assert mock_server.login.call_count == 1
+        assert mock_server.send_message.call_count == 3
+        
+        # Stale connection is replaced
+        mock_server.noop.return_value = (421, b'Closing')
+        alerter._send_email('Test Alert', 'Test message', ['recipient@test.com'])
+        assert mock_smtp.call_count == 2
+        
+        alerter._close_smtp()
         assert mock_server.quit.called
     
+    @patch('smtplib.SMTP')
+    def test_send_email_failure_closes_under_lock(self, mock_smtp, temp_config, monkeypatch):
+        """Test a failed send drops the shared connection while still holding the SMTP lock"""
+        monkeypatch.setenv('SMTP_HOST', 'smtp.test.com')
+        monkeypatch.setenv('SMTP_USER', 'test@test.com')
+        monkeypatch.setenv('SMTP_PASSWORD', 'password')
+        
+        alerter = Alerter(temp_config)
+        held = []
+        
+        mock_server = MagicMock()
+        mock_server.send_message.side_effect = OSError("connection reset")
+        mock_server.quit.side_effect = lambda: held.append(alerter._smtp_lock.locked())
+        mock_smtp.return_value = mock_server
+        
+        alerter._send_email('Test Alert', 'Test message', ['recipient@test.com'])
+        
+        assert held == [True]
+        assert alerter._smtp is None
+    
+    def test_send_sms_twilio_all_recipients(self, temp_config, monkeypatch):
+        """Test Twilio SMS reaches every recipient even if one send fails"""
+        monkeypatch.setenv('TWILIO_ACCOUNT_SID', 'sid')
+        monkeypatch.setenv('TWILIO_AUTH_TOKEN', 'token')
+        monkeypatch.setenv('TWILIO_FROM_NUMBER', '+15550000000')
+        
+        mock_client = MagicMock()
+        
+        def create(body, to, **sender):
+            if to == '+15550000002':
+                raise RuntimeError('Invalid number')
+        
+        mock_client.messages.create.side_effect = create
+        twilio_rest = Mock(Client=Mock(return_value=mock_client))
+        monkeypatch.setitem(sys.modules, 'twilio', Mock(rest=twilio_rest))
+        monkeypatch.setitem(sys.modules, 'twilio.rest', twilio_rest)
+        
+        alerter = Alerter(temp_config)
+        recipients = ['+15550000001', '+15550000002', '+15550000003']
+        alerter._send_sms_twilio('CRITICAL', {'recipients': recipients})
+        
+        sent_to = {c.kwargs['to'] for c in mock_client.messages.create.call_args_list}
+        assert sent_to == set(recipients)
+        assert mock_client.messages.create.call_args.kwargs['from_'] == '+15550000000'
+        
+        # Client is built once and reused
+        alerter._send_sms_twilio('CRITICAL', {'recipients': recipients})
+        assert twilio_rest.Client.call_count == 1
+    
+    def test_send_sms_twilio_messaging_service(self, temp_config, monkeypatch):
+        """Test Twilio SMS uses a messaging service when configured"""
+        monkeypatch.setenv('TWILIO_ACCOUNT_SID', 'sid')
+        monkeypatch.setenv('TWILIO_AUTH_TOKEN', 'token')
+        monkeypatch.delenv('TWILIO_FROM_NUMBER', raising=False)
+        monkeypatch.setenv('TWILIO_MESSAGING_SERVICE_SID', 'MG123')
+        
+        mock_client = MagicMock()
+        twilio_rest = Mock(Client=Mock(return_value=mock_client))
+        monkeypatch.setitem(sys.modules, 'twilio', Mock(rest=twilio_rest))
+        monkeypatch.setitem(sys.modules, 'twilio.rest', twilio_rest)
+        
+        alerter = Alerter(temp_config)
+        alerter._send_sms_twilio('CRITICAL', {'recipients': ['+15550000001']})
+        
+        kwargs = mock_client.messages.create.call_args.kwargs
+        assert kwargs['messaging_service_sid'] == 'MG123'
+        assert 'from_' not in kwargs
+    
     def test_escalation_thresholds(self, temp_config):
         """Test alert escalation based on failure count"""
         alerter = Alerter(temp_config)
@@ -621,7 +1375,289 @@ class TestAlerter:
         
         assert email_threshold == 3
         assert sms_threshold == 5
+        
+        # Resolved once at construction
+        assert alerter.email_threshold == 3
+        assert alerter.sms_threshold == 5
+        assert alerter.email_recipients == ('test@example.com',)
+    
+    def test_escalation_sends_at_threshold(self, temp_config):
+        """Test email and SMS fire only when their threshold is reached"""
+        alerter = Alerter(temp_config)
+        alerter._send_email = Mock()
+        alerter._send_sms = Mock()
+        
+        result = {
+            'name': 'Test Service',
+            'status': 'failure',
+            'status_code': 500,
+            'error_message': 'Internal Server Error',
+            'alert_channels': ['slack', 'email', 'sms']
+        }
+        
+        for count in range(1, 7):
+            alerter.send_escalation_alert(result, None, count)
+        
+        assert alerter._send_email.call_count == 1
+        assert alerter._send_email.call_args[0][2] == ['test@example.com']
+        assert alerter._send_sms.call_count == 1
+    
+    def test_escalation_channels_sent_concurrently(self, temp_config):
+        """Test email and SMS escalations at the same count run in parallel"""
+        import threading
+        
+        alerter = Alerter(temp_config)
+        alerter.sms_threshold = alerter.email_threshold
+        
+        # Each send waits for the other; a serial dispatch would break the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        alerter._send_email = Mock(side_effect=lambda *args: barrier.wait())
+        alerter._send_sms = Mock(side_effect=lambda *args: barrier.wait())
+        
+        result = {
+            'name': 'Test Service',
+            'status': 'failure',
+            'error_message': 'Internal Server Error',
+            'alert_channels': ['email', 'sms']
+        }
+        
+        alerter.send_escalation_alert(result, None, alerter.email_threshold)
+        
+        assert alerter._send_email.called
+        assert alerter._send_sms.called
+        assert not barrier.broken
 
+    def test_escalation_reports_only_delivered_sends(self, temp_config, caplog):
+        """Test escalations are reported as sent only once the send succeeds"""
+        alerter = Alerter(temp_config)
+        alerter.sms_threshold = alerter.email_threshold
+        alerter._send_email = Mock(return_value=False)
+        alerter._send_sms = Mock(return_value=True)
+        
+        result = {
+            'name': 'Test Service',
+            'status': 'failure',
+            'error_message': 'Internal Server Error',
+            'alert_channels': ['email', 'sms']
+        }
+        
+        with caplog.at_level(logging.INFO, logger='watchdog'):
+            alerter.send_escalation_alert(result, None, alerter.email_threshold)
+        
+        assert 'Email alert sent' not in caplog.text
+        assert 'SMS alert sent' in caplog.text
+    
+    def test_dispatch_reports_unfinished_sends(self, temp_config, caplog):
+        """Test sends still running after the timeout are reported, then joined at exit"""
+        import threading
+        from alerter import _shutdown_alerters
+        
+        alerter = Alerter(temp_config)
+        release = threading.Event()
+        slow = Mock(side_effect=lambda: release.wait(5) or True)
+        fast = Mock(return_value=True)
+        
+        with caplog.at_level(logging.INFO, logger='watchdog'):
+            sent = alerter._dispatch([('email', slow, ()), ('sms', fast, ())], timeout=0.05)
+        
+        assert sent == {'email': None, 'sms': True}
+        assert 'email alert still sending' in caplog.text
+        
+        release.set()
+        # Only this alerter: others from earlier tests may still be alive
+        with patch('alerter._live_alerters', {alerter}):
+            _shutdown_alerters()
+        assert alerter._io_pool._shutdown
+        assert slow.called
+    
+    def test_config_parse_cached_until_modified(self, tmp_path):
+        """Test config is parsed once and re-read after the file changes"""
+        config_path = tmp_path / 'targets.yaml'
+        config_path.write_text("alerts:\n  email:\n    escalate_after: 3\n")
+        
+        import config_loader
+        
+        with patch.object(config_loader.yaml, 'load', wraps=config_loader.yaml.load) as parse:
+            first = Alerter(config_path)
+            second = Alerter(config_path)
+            
+            assert parse.call_count == 1
+            assert second.config == first.config
+            
+            # Rewrite with a later mtime so the cached parse is invalidated
+            config_path.write_text("alerts:\n  email:\n    escalate_after: 4\n")
+            stat = os.stat(config_path)
+            os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            
+            cached = len(config_loader._YAML_CACHE)
+            
+            third = Alerter(config_path)
+            assert parse.call_count == 2
+            assert third.email_threshold == 4
+        
+        # The edited file replaces its cache entry instead of adding another
+        assert len(config_loader._YAML_CACHE) == cached
+    
+    def test_config_copies_are_independent(self, tmp_path):
+        """Test mutating one loaded config doesn't leak into later loads"""
+        from config_loader import load_config
+        config_path = tmp_path / 'targets.yaml'
+        config_path.write_text("alerts:\n  email:\n    recipients: [ops@example.com]\n")
+        
+        first = load_config(config_path)
+        first['alerts']['email']['recipients'].append('intruder@example.com')
+        first['extra'] = True
+        
+        assert load_config(config_path) == {'alerts': {'email': {'recipients': ['ops@example.com']}}}
+    
+    def test_config_json_sidecar(self, temp_config):
+        """Test parsed config is persisted to and read back from a JSON sidecar"""
+        alerter = Alerter(temp_config)
+        sidecar = temp_config + '.cache.json'
+        
+        assert os.path.exists(sidecar)
+        with open(sidecar) as f:
+            assert json.load(f)['config'] == alerter.config
+        
+        # A fresh process has no in-memory cache; the sidecar is used instead of YAML
+        import config_loader
+        config_loader._YAML_CACHE.clear()
+        
+        with patch('config_loader.yaml.load') as mock_load:
+            assert Alerter(temp_config).config == alerter.config
+            assert not mock_load.called
+    
+    def test_config_sidecar_skipped_for_non_string_keys(self, tmp_path):
+        """Test configs JSON can't round-trip (e.g. int keys) are never cached to disk"""
+        import config_loader
+        config_path = tmp_path / 'targets.yaml'
+        config_path.write_text("codes:\n  200: ok\n  true: x\n")
+        
+        expected = {'codes': {200: 'ok', True: 'x'}}
+        assert config_loader.load_config(config_path) == expected
+        assert not os.path.exists(str(config_path) + '.cache.json')
+        
+        # A later process parses the YAML again and sees the same config
+        config_loader._YAML_CACHE.clear()
+        assert config_loader.load_config(config_path) == expected
+    
+    def test_config_sidecar_ignored_for_older_mtime(self, tmp_path):
+        """Test a YAML replaced with an older mtime (cp -p, rsync -a) is re-parsed"""
+        import config_loader
+        config_path = tmp_path / 'targets.yaml'
+        config_path.write_text("a: 1\n")
+        os.chmod(config_path, 0o644)
+        
+        assert config_loader.load_config(config_path) == {'a': 1}
+        sidecar = str(config_path) + '.cache.json'
+        assert oct(os.stat(sidecar).st_mode & 0o777) == oct(0o644)
+        
+        stat = os.stat(config_path)
+        config_path.write_text("a: 2\n")
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 60_000_000_000))
+        config_loader._YAML_CACHE.clear()
+        
+        assert config_loader.load_config(config_path) == {'a': 2}
+
+
+# ============================================================================
+# STATUS VIEWER TESTS
+# ============================================================================
+
+class TestStatus:
+    """Test status.py output"""
+    
+    def test_print_plain_aligns_columns(self, capsys):
+        """Test the plain table pads every column to its widest cell"""
+        status._print_plain([('api', 200, '12ms'), ('web-frontend', '-', '-')], ['Target', 'Code', 'Time'])
+        
+        assert capsys.readouterr().out.splitlines() == [
+            "Target        Code  Time",
+            "------------  ----  ----",
+            "api           200   12ms",
+            "web-frontend  -     -",
+        ]
+    
+    def test_print_plain_empty(self, capsys):
+        """Test the plain table prints just the header for no rows"""
+        status._print_plain([], ['Time', 'Target'])
+        
+        assert capsys.readouterr().out.splitlines() == [
+            "Time  Target",
+            "----  ------",
+        ]
+    
+    def test_recent_checks_large_limit_uses_plain_table(self, temp_db, temp_config, capsys):
+        """Test limits above the threshold skip tabulate"""
+        temp_db.load_targets_from_config(temp_config)
+        target_id = temp_db.get_active_targets()[0].id
+        temp_db.record_check(target_id, 'success', 200, 150.4)
+        capsys.readouterr()
+        
+        with patch('tabulate.tabulate') as mock_tabulate:
+            status.show_recent_checks(temp_db.conn, status.PLAIN_TABLE_THRESHOLD + 1)
+        
+        assert not mock_tabulate.called
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[3].split() == ['Time', 'Target', 'Status', 'Code', 'Time', 'Error']
+        assert lines[5].split()[2:] == ['✓', 'Test', 'Service', 'success', '200', '150ms', '-']
+    
+    def test_show_stats(self, temp_db, temp_config, capsys):
+        """Test uptime and average response come out of the SQL aggregate"""
+        temp_db.load_targets_from_config(temp_config)
+        up, down = (t.id for t in temp_db.get_active_targets())
+        
+        for response_time in (100, 200, 300):
+            temp_db.record_check(up, 'success', 200, response_time)
+        temp_db.record_check(up, 'failure', 500, 5000)
+        temp_db.record_check(down, 'timeout', None, None, 'Timeout after 10s')
+        temp_db.record_check(down, 'error', None, None, 'Connection refused')
+        
+        # Outside the 24-hour window
+        old_id = temp_db.record_check(up, 'failure', 500, 1)
+        temp_db.conn.execute(
+            "UPDATE checks SET timestamp = datetime('now', '-2 days') WHERE id = ?", (old_id,)
+        )
+        capsys.readouterr()
+        
+        status.show_stats(temp_db.conn)
+        
+        rows = {
+            line.split('  ')[0]: line.split()[-3:]
+            for line in capsys.readouterr().out.splitlines()
+            if 'Service' in line
+        }
+        # Failed checks don't count towards the average response time
+        assert rows['Test Service'] == ['75.0%', '3/4', '200ms']
+        # All checks failed: 0% uptime and no average rather than an error
+        assert rows['Slow Service'] == ['0.0%', '0/2', '-']
+
+    
+    def test_main_opens_and_closes_one_connection(self, tmp_path, temp_config, monkeypatch, capsys):
+        """Test main() shares one read-only connection across the views and closes it"""
+        db = WatchdogDB(tmp_path / 'watchdog.db')
+        db.connect()
+        db.init_schema()
+        db.load_targets_from_config(temp_config)
+        db.conn.close()
+        
+        monkeypatch.setattr(status, 'DB_PATH', tmp_path / 'watchdog.db')
+        monkeypatch.setattr(sys, 'argv', ['status.py', 'all'])
+        
+        real_connect = status.connect_db
+        opened = []
+        
+        def connect_db(path):
+            opened.append(real_connect(path))
+            return opened[-1]
+        
+        monkeypatch.setattr(status, 'connect_db', connect_db)
+        status.main()
+        
+        assert 'No active incidents' in capsys.readouterr().out
+        assert len(opened) == 1
+        with pytest.raises(sqlite3.ProgrammingError):
+            opened[0].execute("SELECT 1")
 
 # ============================================================================
 # INTEGRATION TESTS
@@ -638,13 +1674,14 @@ class TestIntegration:
         
         mock_alerter_instance = MagicMock()
         mock_alerter.return_value = mock_alerter_instance
+        mock_requests.Session.return_value.request = mock_requests.request
         
         watchdog = Watchdog(temp_db.db_path, temp_config)
         watchdog.db = temp_db
         
         targets = temp_db.get_active_targets()
         target = targets[0]
-        target_id = target['id']
+        target_id = target.id
         
         # Simulate 5 consecutive failures
         mock_response = Mock()
@@ -657,7 +1694,7 @@ class TestIntegration:
         
         # Verify incident exists with correct count
         incident = temp_db.get_open_incident(target_id)
-        assert incident['failure_count'] == 5
+        assert incident.failure_count == 5
         
         # Verify initial alert was sent
         assert mock_alerter_instance.send_initial_alert.called
@@ -679,6 +1716,203 @@ class TestIntegration:
         # Verify recovery alert was sent
         assert mock_alerter_instance.send_recovery_alert.called
     
+    def test_run_checks_all_targets(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test a full check cycle over every active target"""
+        temp_db.load_targets_from_config(temp_config)
+        
+        mock_response = Mock()
+        mock_response.status_code = 500
+        mock_requests.request.return_value = mock_response
+        
+        # run_checks opens its own connection to the same database
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        watchdog.run_checks()
+        
+        for target in temp_db.get_active_targets():
+            incident = temp_db.get_open_incident(target.id)
+            assert incident is not None
+            assert incident.failure_count == 1
+        
+        assert watchdog.alerter.send_initial_alert.call_count == 2
+        
+        watchdog.db.conn.close()
+    
+    def test_run_checks_healthy_skips_incident_lookup(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test healthy targets without an open incident need no per-target lookup"""
+        temp_db.load_targets_from_config(temp_config)
+        targets = temp_db.get_active_targets()
+        
+        # Only the second target has an open incident
+        check_id = temp_db.record_check(targets[1].id, 'failure', 500)
+        temp_db.create_incident(targets[1].id, check_id)
+        
+        mock_requests.request.return_value = Mock(status_code=200)
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        with patch.object(WatchdogDB, 'get_open_incident', autospec=True,
+                          side_effect=WatchdogDB.get_open_incident) as lookup:
+            watchdog.run_checks()
+        
+        assert [c.args[1] for c in lookup.call_args_list] == [targets[1].id]
+        assert temp_db.get_open_incident(targets[1].id) is None
+        assert watchdog.alerter.send_recovery_alert.call_count == 1
+        
+        watchdog.db.conn.close()
+    
+    def test_run_checks_alerts_after_commit(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test alerts go out only once the cycle's writes are committed"""
+        temp_db.load_targets_from_config(temp_config)
+        mock_requests.request.return_value = Mock(status_code=500)
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        
+        def send_initial_alert(result):
+            # A separate connection only sees committed rows
+            assert not watchdog.db.conn.in_transaction
+            incident = temp_db.get_open_incident(result['target_id'])
+            assert incident is not None
+        
+        watchdog.alerter.send_initial_alert.side_effect = send_initial_alert
+        watchdog.run_checks()
+        
+        assert watchdog.alerter.send_initial_alert.call_count == 2
+        
+        watchdog.db.conn.close()
+    
+    def test_run_checks_rolled_back_cycle_sends_nothing(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test a cycle that fails mid-write neither persists nor alerts"""
+        temp_db.load_targets_from_config(temp_config)
+        mock_requests.request.return_value = Mock(status_code=500)
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        
+        with patch.object(WatchdogDB, 'prune_checks', side_effect=sqlite3.OperationalError("disk I/O error")):
+            with pytest.raises(sqlite3.OperationalError):
+                watchdog.run_checks()
+        
+        assert not watchdog.alerter.send_initial_alert.called
+        assert temp_db.conn.execute("SELECT COUNT(*) FROM incidents").fetchone()[0] == 0
+        
+        watchdog.db.conn.close()
+    
+    def test_run_checks_prunes_every_nth_cycle(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test retention runs on the first cycle and then every PRUNE_EVERY cycles"""
+        temp_db.load_targets_from_config(temp_config)
+        mock_requests.request.return_value = Mock(status_code=200)
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        with patch.object(WatchdogDB, 'prune_checks', return_value=0) as prune:
+            for _ in range(watchdog_module.PRUNE_EVERY + 1):
+                watchdog.run_checks()
+        
+        assert prune.call_count == 2
+        
+        watchdog.db.conn.close()
+    
+    def test_run_checks_async_falls_back_without_aiohttp(self, temp_db, temp_config, mock_requests, mock_alerter, caplog):
+        """Test the async cycle warns and uses the threaded checks when aiohttp is missing"""
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        
+        with patch.dict(sys.modules, {'aiohttp': None}), \
+             patch.object(watchdog, 'run_checks') as run_checks, \
+             caplog.at_level(logging.WARNING, logger='watchdog'):
+            watchdog.run_checks_async()
+        
+        run_checks.assert_called_once_with()
+        assert [r.levelno for r in caplog.records] == [logging.WARNING]
+    
+    def test_run_checks_async_cycle(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test the async cycle fetches on one session, then records and alerts"""
+        import asyncio
+        import types
+        from contextlib import asynccontextmanager
+        temp_db.load_targets_from_config(temp_config)
+        temp_db.conn.execute("UPDATE targets SET contains = 'healthy' WHERE name = 'Test Service'")
+        
+        responses = []
+        sessions = []
+        
+        async def iter_chunked(size):
+            for chunk in (b"Status: hea", b"lthy", b" and more"):
+                yield chunk
+        
+        class ClientSession:
+            def __init__(self, connector):
+                sessions.append(connector)
+            
+            async def __aenter__(self):
+                return self
+            
+            async def __aexit__(self, *exc):
+                return False
+            
+            @asynccontextmanager
+            async def request(self, method, url, timeout):
+                if 'slow' in url:
+                    raise asyncio.TimeoutError()
+                response = Mock(status=200, content_length=24, content=Mock(iter_chunked=iter_chunked))
+                response.read = AsyncMock()
+                responses.append(response)
+                yield response
+        
+        aiohttp = types.ModuleType('aiohttp')
+        aiohttp.ClientSession = ClientSession
+        aiohttp.ClientTimeout = lambda total: total
+        aiohttp.TCPConnector = lambda **kwargs: kwargs
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        with patch.dict(sys.modules, {'aiohttp': aiohttp}):
+            watchdog.run_checks_async()
+        
+        cursor = temp_db.conn.execute("""
+            SELECT t.name, c.status, c.status_code, c.error_message
+            FROM checks c JOIN targets t ON c.target_id = t.id
+            ORDER BY t.name
+        """)
+        assert [tuple(row) for row in cursor] == [
+            ('Slow Service', 'timeout', None, 'Timeout after 1s'),
+            ('Test Service', 'success', 200, None),
+        ]
+        
+        # Only the timed-out target opens an incident and alerts
+        slow = temp_db.get_active_targets()[1]
+        assert temp_db.get_open_incident(slow.id) is not None
+        assert watchdog.alerter.send_initial_alert.call_count == 1
+        
+        # Small bodies are finished so the connection can be reused
+        assert [r.read.await_count for r in responses] == [1]
+        
+        # One session, bounded and caching DNS like the threaded path
+        assert sessions == [{
+            'limit': watchdog_module.MAX_CONCURRENT_CHECKS,
+            'ttl_dns_cache': watchdog_module.DNS_CACHE_TTL,
+        }]
+        
+        watchdog.db.conn.close()
+    
+    def test_run_checks_requests_concurrently(self, temp_db, temp_config, mock_requests, mock_alerter):
+        """Test target requests in a cycle are issued in parallel"""
+        import threading
+        temp_db.load_targets_from_config(temp_config)
+        
+        # Both requests must be in flight at once to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        
+        def request(*args, **kwargs):
+            barrier.wait()
+            return Mock(status_code=200, text="OK")
+        
+        mock_requests.request.side_effect = request
+        
+        watchdog = Watchdog(temp_db.db_path, temp_config)
+        watchdog.run_checks()
+        
+        cursor = temp_db.conn.cursor()
+        cursor.execute("SELECT status FROM checks")
+        assert [row[0] for row in cursor.fetchall()] == ['success', 'success']
+        
+        watchdog.db.conn.close()
+    
     @patch('watchdog.Alerter')
     @patch('watchdog.requests')
     def test_multiple_targets_independent_incidents(self, mock_requests, mock_alerter, temp_db, temp_config):
@@ -687,6 +1921,7 @@ class TestIntegration:
         
         mock_alerter_instance = MagicMock()
         mock_alerter.return_value = mock_alerter_instance
+        mock_requests.Session.return_value.request = mock_requests.request
         
         watchdog = Watchdog(temp_db.db_path, temp_config)
         watchdog.db = temp_db
@@ -704,11 +1939,11 @@ class TestIntegration:
         watchdog.handle_result(result)
         
         # Verify target 1 has incident
-        incident1 = temp_db.get_open_incident(target1['id'])
+        incident1 = temp_db.get_open_incident(target1.id)
         assert incident1 is not None
         
         # Verify target 2 has no incident
-        incident2 = temp_db.get_open_incident(target2['id'])
+        incident2 = temp_db.get_open_incident(target2.id)
         assert incident2 is None
         
         # Fail target 2
@@ -716,12 +1951,12 @@ class TestIntegration:
         watchdog.handle_result(result)
         
         # Verify both have incidents now
-        incident1 = temp_db.get_open_incident(target1['id'])
-        incident2 = temp_db.get_open_incident(target2['id'])
+        incident1 = temp_db.get_open_incident(target1.id)
+        incident2 = temp_db.get_open_incident(target2.id)
         
         assert incident1 is not None
         assert incident2 is not None
-        assert incident1['id'] != incident2['id']
+        assert incident1.id != incident2.id
 
 
 # ============================================================================
@@ -747,7 +1982,7 @@ class TestEdgeCases:
         
         targets = temp_db.get_active_targets()
         assert len(targets) == 1
-        assert targets[0]['name'] == 'Slow Service'
+        assert targets[0].name == 'Slow Service'
     
     def test_very_slow_response(self, temp_db, temp_config, mock_requests, mock_alerter):
         """Test handling of very slow responses"""
@@ -790,7 +2025,7 @@ class TestEdgeCases:
         """Test that only one open incident exists per target"""
         temp_db.load_targets_from_config(temp_config)
         targets = temp_db.get_active_targets()
-        target_id = targets[0]['id']
+        target_id = targets[0].id
         
         # Create first incident
         check_id1 = temp_db.record_check(target_id, 'failure', 500)
@@ -801,7 +2036,7 @@ class TestEdgeCases:
         
         # Get open incident (should be the first one)
         incident = temp_db.get_open_incident(target_id)
-        assert incident['id'] == incident_id1
+        assert incident.id == incident_id1
 
 
 if __name__ == '__main__':
@@ -4,15 +4,24 @@ Website Watchdog - System Monitoring
 Checks configured endpoints and alerts on failures
 """
 
+import asyncio
 import sqlite3
 import time
 import sys
 import os
 import json
+import logging
+import socket
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-import yaml
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3.util.connection
 from dotenv import load_dotenv
 
 # Add project root to path for imports
@@ -20,43 +29,277 @@ PROJECT_ROOT = Path(__file__).parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from alerter import Alerter
+from config_loader import load_config
 
 load_dotenv(PROJECT_ROOT / ".env")
 
+# Read once; init_schema runs for every fresh database (and test fixture)
+_SCHEMA_SQL = (PROJECT_ROOT / "db" / "schema.sql").read_text()
+
+# Stored in PRAGMA user_version; bump whenever db/schema.sql changes so
+# existing databases re-apply it on their next connect
+SCHEMA_VERSION = 1
+
+# UPDATE ... RETURNING needs SQLite 3.35+; older builds (e.g. the stock
+# Python 3.9 on some distros) look the incident up first instead
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+# Check history retention, pruned every Nth cycle (and on a process's first)
+CHECK_RETENTION_DAYS = 30
+PRUNE_EVERY = 12
+
+# Bodies up to this size are read to the end after a check so the
+# keep-alive connection goes back to the pool; larger or unsized ones are
+# cheaper to drop than to download
+DRAIN_LIMIT = 64 * 1024
+
+# Most requests (threads, or aiohttp connections) in flight per cycle
+MAX_CONCURRENT_CHECKS = 32
+
+# Check-loop output: one formatted record (one write) per event
+logger = logging.getLogger("watchdog")
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    """StreamHandler that leaves flushing to the stream's own buffering"""
+    
+    def emit(self, record):
+        # StreamHandler.emit flushes after every record; under cron/launchd
+        # stdout is a file, so let it block-buffer like print() does
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+@dataclass
+class CompiledTarget:
+    """Per-target check settings, decoded once when targets are loaded"""
+    # Declared by hand: dataclass(slots=True) needs Python 3.10
+    __slots__ = (
+        'id', 'name', 'url', 'method', 'expected_status', 'timeout',
+        'contains', 'contains_bytes', 'alert_channels'
+    )
+    
+    id: int
+    name: str
+    url: str
+    method: str
+    expected_status: int
+    timeout: int
+    contains: str
+    contains_bytes: bytes
+    alert_channels: list
+
+
+# Fetched rows, with only the columns the check loop reads
+Incident = namedtuple('Incident', [
+    'id', 'target_id', 'started_at', 'status', 'failure_count', 'last_check_id',
+    'slack_alerted', 'email_alerted', 'sms_alerted'
+])
+INCIDENT_COLUMNS = ', '.join(Incident._fields)
+
+
+def _target_row(cursor, row):
+    """Row factory for CompiledTarget; encodes the marker and decodes channels once"""
+    target_id, name, url, method, expected_status, timeout, contains, channels = row
+    return CompiledTarget(
+        target_id, name, url, method, expected_status, timeout,
+        contains, contains.encode('utf-8') if contains else None,
+        json.loads(channels or '["slack"]')
+    )
+
+
+def _incident_row(cursor, row):
+    """Row factory for Incident"""
+    return Incident(*row)
+
+
+class _MarkerScan:
+    """Incremental search for a byte marker across a body's chunks"""
+    
+    def __init__(self, marker):
+        self.marker = marker
+        self.keep = len(marker) - 1
+        self.tail = b''
+    
+    def feed(self, chunk):
+        """Add the next chunk; True once the marker has been seen"""
+        buf = self.tail + chunk
+        if buf.find(self.marker) != -1:
+            return True
+        # Carry enough bytes to catch a marker split across chunks
+        self.tail = buf[-self.keep:] if self.keep else b''
+        return False
+
+
+# Resolved addresses for the check session, reused until they expire.
+# Only connections opened by CachedDNSAdapter use this; socket.getaddrinfo
+# and other urllib3 users (e.g. the alerter's sessions) are untouched
+DNS_CACHE_TTL = 60
+DNS_CACHE_SIZE = 256
+_dns_cache = {}
+_dns_inflight = {}
+_dns_lock = threading.Lock()
+_dns_scope = threading.local()
+_system_getaddrinfo = socket.getaddrinfo
+_urllib3_create_connection = urllib3.util.connection.create_connection
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """getaddrinfo with a short TTL cache; failed lookups are not cached"""
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and now - entry[0] < DNS_CACHE_TTL:
+            return entry[1]
+        # [lock, callers]: the entry stays until every caller has seen the
+        # result, so late arrivals wait on the same lookup instead of a new one
+        inflight = _dns_inflight.setdefault(key, [threading.Lock(), 0])
+        inflight[1] += 1
+    
+    try:
+        # Concurrent checks of one host wait for a single lookup instead of
+        # all missing the cache at once
+        with inflight[0]:
+            with _dns_lock:
+                entry = _dns_cache.get(key)
+                if entry and now - entry[0] < DNS_CACHE_TTL:
+                    return entry[1]
+            
+            addresses = _system_getaddrinfo(host, port, family, type, proto, flags)
+            
+            with _dns_lock:
+                if len(_dns_cache) >= DNS_CACHE_SIZE:
+                    # Drop the oldest entry (dicts keep insertion order)
+                    _dns_cache.pop(next(iter(_dns_cache)))
+                _dns_cache.pop(key, None)
+                _dns_cache[key] = (now, addresses)
+            return addresses
+    finally:
+        with _dns_lock:
+            inflight[1] -= 1
+            if not inflight[1]:
+                del _dns_inflight[key]
+
+
+def _create_connection(address, *args, **kwargs):
+    """urllib3's create_connection, resolving through the DNS cache inside CachedDNSAdapter"""
+    if not getattr(_dns_scope, 'active', False):
+        return _urllib3_create_connection(address, *args, **kwargs)
+    
+    host, port = address
+    try:
+        addresses = _cached_getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    except OSError:
+        # Let urllib3 resolve again and report the failure its own way
+        return _urllib3_create_connection(address, *args, **kwargs)
+    
+    # Try each address in turn, as urllib3's own loop does; TLS still
+    # verifies against the connection's hostname, not the address
+    error = None
+    for *_, sockaddr in addresses:
+        try:
+            return _urllib3_create_connection((sockaddr[0], port), *args, **kwargs)
+        except OSError as e:
+            error = e
+    raise error
+
+
+# urllib3 opens every connection through this one module-level function
+urllib3.util.connection.create_connection = _create_connection
+
+
+class CachedDNSAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections resolve hosts through the DNS cache"""
+    
+    def send(self, *args, **kwargs):
+        # Connections are opened on the calling thread within send()
+        _dns_scope.active = True
+        try:
+            return super().send(*args, **kwargs)
+        finally:
+            _dns_scope.active = False
+
+
 class WatchdogDB:
     """Handle database operations"""
     
+    # Fixed statements per channel, so SQLite's statement cache can reuse them
+    _MARK_ALERT_SQL = {
+        'slack': "UPDATE incidents SET slack_alerted = 1 WHERE id = ?",
+        'email': "UPDATE incidents SET email_alerted = 1 WHERE id = ?",
+        'sms': "UPDATE incidents SET sms_alerted = 1 WHERE id = ?",
+    }
+    
     def __init__(self, db_path):
         self.db_path = db_path
         self.conn = None
     
     def connect(self):
         """Connect to database"""
-        self.conn = sqlite3.connect(self.db_path)
+        # Autocommit: transactions only where batch() opens one explicitly.
+        # 'file:' URIs allow shared-cache in-memory databases (used by tests)
+        self.conn = sqlite3.connect(
+            self.db_path,
+            isolation_level=None,
+            check_same_thread=False,
+            uri=str(self.db_path).startswith('file:')
+        )
         self.conn.row_factory = sqlite3.Row
+        
+        # WAL lets status.py read while checks write, and with synchronous=NORMAL
+        # a commit is a WAL append rather than a journal fsync cycle
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA temp_store = MEMORY")
+        self.conn.execute("PRAGMA mmap_size = 268435456")
+        self.conn.execute("PRAGMA busy_timeout = 5000")
+        
+        # Databases made by an older init are brought up to date (e.g. newer
+        # indexes); fresh, empty ones are left for init_schema
+        if self._schema_outdated() and self.conn.execute(
+            "SELECT 1 FROM sqlite_master LIMIT 1"
+        ).fetchone():
+            self._apply_schema()
         return self.conn
     
+    def _schema_outdated(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION
+    
+    def _apply_schema(self):
+        # The schema is all CREATE ... IF NOT EXISTS, so re-applying it
+        # never touches existing rows
+        self.conn.executescript(_SCHEMA_SQL)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    @contextmanager
+    def batch(self):
+        """Group writes into one transaction, committed when the block exits"""
+        # IMMEDIATE takes the write lock up front, so the transaction never
+        # has to upgrade from a read lock mid-cycle
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+    
     def init_schema(self):
         """Initialize database schema"""
-        schema_path = PROJECT_ROOT / "db" / "schema.sql"
-        with open(schema_path) as f:
-            self.conn.executescript(f.read())
-        self.conn.commit()
-        print(f"✓ Database initialized: {self.db_path}")
+        if self._schema_outdated():
+            self._apply_schema()
+        logger.info("✓ Database initialized: %s", self.db_path)
     
     def load_targets_from_config(self, config_path):
         """Load targets from YAML config into database"""
-        with open(config_path) as f:
-            config = yaml.safe_load(f)
+        config = load_config(config_path)
         
-        cursor = self.conn.cursor()
-        
-        for target in config.get('targets', []):
-            cursor.execute("""
-                INSERT OR REPLACE INTO targets 
-                (name, url, method, expected_status, timeout, contains, alert_channels)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
+        rows = [
+            (
                 target['name'],
                 target['url'],
                 target.get('method', 'GET'),
@@ -64,15 +307,27 @@ class WatchdogDB:
                 target.get('timeout', 10),
                 target.get('contains'),
                 json.dumps(target.get('alert_channels', ['slack']))
-            ))
+            )
+            for target in config.get('targets', [])
+        ]
         
-        self.conn.commit()
-        print(f"✓ Loaded {len(config['targets'])} targets from config")
+        # One prepared statement and one transaction for all targets
+        with self.batch():
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO targets 
+                (name, url, method, expected_status, timeout, contains, alert_channels)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        logger.info("✓ Loaded %s targets from config", len(rows))
     
     def get_active_targets(self):
         """Get all enabled monitoring targets"""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM targets WHERE enabled = 1")
+        cursor.row_factory = _target_row
+        cursor.execute("""
+            SELECT id, name, url, method, expected_status, timeout, contains, alert_channels
+            FROM targets WHERE enabled = 1
+        """)
         return cursor.fetchall()
     
     def record_check(self, target_id, status, status_code=None, response_time=None, error_message=None):
@@ -82,19 +337,24 @@ class WatchdogDB:
             INSERT INTO checks (target_id, status, status_code, response_time, error_message)
             VALUES (?, ?, ?, ?, ?)
         """, (target_id, status, status_code, response_time, error_message))
-        self.conn.commit()
         return cursor.lastrowid
     
     def get_open_incident(self, target_id):
         """Get open incident for target, if any"""
         cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM incidents 
+        cursor.row_factory = _incident_row
+        cursor.execute(f"""
+            SELECT {INCIDENT_COLUMNS} FROM incidents 
             WHERE target_id = ? AND status = 'open'
             ORDER BY started_at DESC LIMIT 1
         """, (target_id,))
         return cursor.fetchone()
     
+    def get_targets_with_open_incidents(self):
+        """Get the ids of all targets that currently have an open incident"""
+        cursor = self.conn.execute("SELECT target_id FROM incidents WHERE status = 'open'")
+        return {row[0] for row in cursor}
+    
     def create_incident(self, target_id, check_id):
         """Create new incident"""
         cursor = self.conn.cursor()
@@ -102,7 +362,6 @@ class WatchdogDB:
             INSERT INTO incidents (target_id, last_check_id, failure_count)
             VALUES (?, ?, 1)
         """, (target_id, check_id))
-        self.conn.commit()
         return cursor.lastrowid
     
     def update_incident(self, incident_id, check_id, increment_count=True):
@@ -120,7 +379,32 @@ class WatchdogDB:
                 SET last_check_id = ?
                 WHERE id = ?
             """, (check_id, incident_id))
-        self.conn.commit()
+    
+    def increment_open_incident(self, target_id, check_id):
+        """Add a failure to the open incident; returns it, or None if none is open"""
+        if not _HAS_RETURNING:
+            incident = self.get_open_incident(target_id)
+            if incident is None:
+                return None
+            self.update_incident(incident.id, check_id)
+            return incident._replace(
+                failure_count=incident.failure_count + 1, last_check_id=check_id
+            )
+        
+        cursor = self.conn.cursor()
+        cursor.row_factory = _incident_row
+        cursor.execute(f"""
+            UPDATE incidents 
+            SET last_check_id = ?, failure_count = failure_count + 1
+            WHERE id = (
+                SELECT id FROM incidents 
+                WHERE target_id = ? AND status = 'open'
+                ORDER BY started_at DESC LIMIT 1
+            )
+            RETURNING {INCIDENT_COLUMNS}
+        """, (check_id, target_id))
+        rows = cursor.fetchall()
+        return rows[0] if rows else None
     
     def resolve_incident(self, incident_id):
         """Mark incident as resolved"""
@@ -130,27 +414,53 @@ class WatchdogDB:
             SET status = 'resolved', resolved_at = CURRENT_TIMESTAMP
             WHERE id = ?
         """, (incident_id,))
-        self.conn.commit()
+    
+    def prune_checks(self, days=CHECK_RETENTION_DAYS):
+        """Delete checks older than the retention window; returns rows removed"""
+        # Range scan on idx_checks_timestamp. Checks an incident (open or
+        # resolved) points at are kept, so incidents.last_check_id stays valid
+        cursor = self.conn.execute("""
+            DELETE FROM checks 
+            WHERE timestamp < datetime('now', ?)
+            AND id NOT IN (
+                SELECT last_check_id FROM incidents 
+                WHERE last_check_id IS NOT NULL
+            )
+        """, (f"-{int(days)} days",))
+        return cursor.rowcount
     
     def mark_alert_sent(self, incident_id, channel):
         """Mark that alert was sent via channel"""
         cursor = self.conn.cursor()
-        column = f"{channel}_alerted"
-        cursor.execute(f"""
-            UPDATE incidents 
-            SET {column} = 1
-            WHERE id = ?
-        """, (incident_id,))
-        self.conn.commit()
+        cursor.execute(self._MARK_ALERT_SQL[channel], (incident_id,))
 
 
 class Watchdog:
-    """Main monitoring watchdog"""
+    """Main monitoring watchdog
+    
+    Progress and alert output goes to the "watchdog" logger. If nothing has
+    configured logging when a Watchdog is created, a stdout handler is
+    attached so embedded use still shows INFO records.
+    """
     
     def __init__(self, db_path, config_path):
+        _configure_logging()
         self.db = WatchdogDB(db_path)
         self.config_path = config_path
         self.alerter = Alerter(config_path)
+        # Cron runs are one cycle per process, so start due and prune on the first
+        self._cycles_since_prune = PRUNE_EVERY
+        
+        # Pooled keep-alive connections; repeat checks skip TCP/TLS setup,
+        # and new connections to a host share one cached DNS lookup
+        self.session = requests.Session()
+        adapter = CachedDNSAdapter(
+            pool_connections=MAX_CONCURRENT_CHECKS,
+            pool_maxsize=MAX_CONCURRENT_CHECKS,
+            max_retries=0
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def init(self):
         """Initialize database and load config"""
@@ -160,137 +470,300 @@ class Watchdog:
     
     def check_target(self, target):
         """Check a single target"""
-        target_id = target['id']
-        name = target['name']
-        url = target['url']
-        
-        print(f"Checking {name}...", end=" ")
+        return self._persist_result(self._perform_http(target))
+    
+    def _perform_http(self, target):
+        """Request a target and evaluate the response (no database access)"""
+        status_code = None
+        response_time = None
         
-        start_time = time.time()
+        t0 = time.perf_counter_ns()
         
         try:
-            response = requests.request(
-                method=target['method'],
-                url=url,
-                timeout=target['timeout']
+            # Stream so the body is only downloaded when content must be checked
+            response = self.session.request(
+                method=target.method,
+                url=target.url,
+                timeout=target.timeout,
+                stream=True
             )
             
-            response_time = (time.time() - start_time) * 1000  # ms
-            status_code = response.status_code
-            
-            # Check status code
-            if status_code != target['expected_status']:
-                status = 'failure'
-                error_msg = f"Expected {target['expected_status']}, got {status_code}"
-                print(f"✗ FAIL ({error_msg})")
-            # Check content if specified
-            elif target['contains'] and target['contains'] not in response.text:
-                status = 'failure'
-                error_msg = f"Expected content '{target['contains']}' not found"
-                print(f"✗ FAIL ({error_msg})")
-            else:
-                status = 'success'
-                error_msg = None
-                print(f"✓ OK ({response_time:.0f}ms)")
+            try:
+                response_time = (time.perf_counter_ns() - t0) / 1_000_000  # ms
+                status_code = response.status_code
+                
+                found = None
+                if self._needs_body(target, status_code):
+                    found = self._body_contains(response, target.contains_bytes)
+                status, error_msg = self._verdict(target, status_code, found)
+            finally:
+                self._release(response)
             
-            check_id = self.db.record_check(
-                target_id, status, status_code, response_time, error_msg
-            )
+        except requests.Timeout:
+            status = 'timeout'
+            error_msg = f"Timeout after {target.timeout}s"
             
-            return {
-                'target_id': target_id,
-                'name': name,
-                'status': status,
-                'status_code': status_code,
-                'response_time': response_time,
-                'error_message': error_msg,
-                'check_id': check_id,
-                'alert_channels': json.loads(target['alert_channels'])
-            }
+        except Exception as e:
+            status = 'error'
+            error_msg = str(e)
+        
+        return self._check_result(target, status, status_code, response_time, error_msg)
+    
+    async def _acheck(self, target, session):
+        """Async counterpart of _perform_http on a shared aiohttp session"""
+        import aiohttp
+        
+        status_code = None
+        response_time = None
+        
+        t0 = time.perf_counter_ns()
+        
+        try:
+            async with session.request(
+                target.method,
+                target.url,
+                timeout=aiohttp.ClientTimeout(total=target.timeout)
+            ) as response:
+                response_time = (time.perf_counter_ns() - t0) / 1_000_000  # ms
+                status_code = response.status
+                
+                found = None
+                if self._needs_body(target, status_code):
+                    scan = _MarkerScan(target.contains_bytes)
+                    found = False
+                    async for chunk in response.content.iter_chunked(8192):
+                        if scan.feed(chunk):
+                            found = True
+                            break
+                status, error_msg = self._verdict(target, status_code, found)
+                
+                # As in _release: finish small bodies so the connection is reused
+                if self._drainable(response.content_length):
+                    await response.read()
             
-        except requests.Timeout:
-            print(f"✗ TIMEOUT")
-            check_id = self.db.record_check(
-                target_id, 'timeout', None, None, f"Timeout after {target['timeout']}s"
-            )
-            return {
-                'target_id': target_id,
-                'name': name,
-                'status': 'timeout',
-                'error_message': f"Timeout after {target['timeout']}s",
-                'check_id': check_id,
-                'alert_channels': json.loads(target['alert_channels'])
-            }
+        except asyncio.TimeoutError:
+            status = 'timeout'
+            error_msg = f"Timeout after {target.timeout}s"
             
         except Exception as e:
-            print(f"✗ ERROR: {e}")
-            check_id = self.db.record_check(
-                target_id, 'error', None, None, str(e)
-            )
-            return {
-                'target_id': target_id,
-                'name': name,
-                'status': 'error',
-                'error_message': str(e),
-                'check_id': check_id,
-                'alert_channels': json.loads(target['alert_channels'])
-            }
-    
-    def handle_result(self, result):
+            status = 'error'
+            error_msg = str(e)
+        
+        return self._check_result(target, status, status_code, response_time, error_msg)
+    
+    @staticmethod
+    def _needs_body(target, status_code):
+        """Whether the verdict depends on the body (status passed, marker set)"""
+        return bool(target.contains_bytes) and status_code == target.expected_status
+    
+    @staticmethod
+    def _verdict(target, status_code, found=None):
+        """Status and error message for a response; found is the body scan result, if run"""
+        if status_code != target.expected_status:
+            return 'failure', f"Expected {target.expected_status}, got {status_code}"
+        if found is False:
+            return 'failure', f"Expected content '{target.contains}' not found"
+        return 'success', None
+    
+    @staticmethod
+    def _drainable(length):
+        """Whether a body of this length is cheaper to read out than to drop"""
+        return length is not None and length <= DRAIN_LIMIT
+    
+    @classmethod
+    def _release(cls, response):
+        """Close a streamed response, returning its connection to the pool if cheap"""
+        try:
+            length = int(response.headers.get('Content-Length'))
+        except (TypeError, ValueError):
+            length = None
+        
+        # A response closed with unread body bytes takes its socket with it
+        if cls._drainable(length):
+            try:
+                for _ in response.iter_content(chunk_size=DRAIN_LIMIT):
+                    pass
+            except Exception:
+                pass
+        
+        response.close()
+    
+    @staticmethod
+    def _check_result(target, status, status_code, response_time, error_msg):
+        """Build the result dict shared by the threaded and async checks"""
+        return {
+            'target_id': target.id,
+            'name': target.name,
+            'status': status,
+            'status_code': status_code,
+            'response_time': response_time,
+            'error_message': error_msg,
+            'check_id': None,
+            'alert_channels': target.alert_channels
+        }
+    
+    @staticmethod
+    def _body_contains(response, marker):
+        """Scan the streamed body for a byte marker, stopping at the first match"""
+        scan = _MarkerScan(marker)
+        return any(scan.feed(chunk) for chunk in response.iter_content(chunk_size=8192))
+    
+    def _persist_result(self, result):
+        """Report and record a check result; adds its check_id"""
+        status = result['status']
+        
+        if status == 'success':
+            outcome = f"✓ OK ({result['response_time']:.0f}ms)"
+        elif status == 'failure':
+            outcome = f"✗ FAIL ({result['error_message']})"
+        elif status == 'timeout':
+            outcome = "✗ TIMEOUT"
+        else:
+            outcome = f"✗ ERROR: {result['error_message']}"
+        logger.info("Checking %s... %s", result['name'], outcome)
+        
+        result['check_id'] = self.db.record_check(
+            result['target_id'],
+            status,
+            result.get('status_code'),
+            result.get('response_time'),
+            result['error_message']
+        )
+        return result
+    
+    def handle_result(self, result, open_ids=None, alerts=None):
         """Handle check result and trigger alerts if needed"""
         target_id = result['target_id']
         status = result['status']
         check_id = result['check_id']
         
-        # Get existing open incident
-        incident = self.db.get_open_incident(target_id)
-        
         if status == 'success':
+            # Healthy with no open incident (per the cycle's prefetch): nothing to do
+            if open_ids is not None and target_id not in open_ids:
+                return
+            
             # Recovery
+            incident = self.db.get_open_incident(target_id)
             if incident:
-                print(f"  → Incident resolved (was down {incident['failure_count']} checks)")
-                self.db.resolve_incident(incident['id'])
-                self.alerter.send_recovery_alert(result, incident)
+                logger.info("  → Incident resolved (was down %s checks)", incident.failure_count)
+                self.db.resolve_incident(incident.id)
+                self._alert(alerts, self.alerter.send_recovery_alert, result, incident)
         else:
-            # Failure
+            # Failure: bump the open incident, if any, in the same statement
+            incident = self.db.increment_open_incident(target_id, check_id)
             if incident:
                 # Ongoing incident
-                self.db.update_incident(incident['id'], check_id, increment_count=True)
-                failure_count = incident['failure_count'] + 1
-                print(f"  → Incident continues ({failure_count} consecutive failures)")
+                failure_count = incident.failure_count
+                logger.info("  → Incident continues (%s consecutive failures)", failure_count)
                 
                 # Escalate alerts based on failure count
-                self.alerter.send_escalation_alert(result, incident, failure_count)
+                self._alert(alerts, self.alerter.send_escalation_alert, result, incident, failure_count)
                 
             else:
                 # New incident
                 incident_id = self.db.create_incident(target_id, check_id)
-                print(f"  → New incident created (#{incident_id})")
+                logger.info("  → New incident created (#%s)", incident_id)
                 
                 # Send initial alert
-                self.alerter.send_initial_alert(result)
+                self._alert(alerts, self.alerter.send_initial_alert, result)
                 
                 # Mark alerts as sent in database
                 for channel in result.get('alert_channels', ['slack']):
                     if channel in ['slack', 'email', 'sms']:
                         self.db.mark_alert_sent(incident_id, channel)
     
+    @staticmethod
+    def _alert(alerts, send, *args):
+        """Send now, or queue on alerts (a list) to send after the cycle commits"""
+        if alerts is None:
+            send(*args)
+        else:
+            alerts.append((send, args))
+    
     def run_checks(self):
         """Run checks on all active targets"""
+        self._run_cycle(self._fetch_threaded)
+    
+    def run_checks_async(self):
+        """Run checks on one event loop with aiohttp; threads if it is missing"""
+        try:
+            import aiohttp
+        except ImportError:
+            logger.warning("aiohttp not installed (pip install aiohttp); check-async is using threaded checks")
+            return self.run_checks()
+        
+        self._run_cycle(lambda targets: asyncio.run(self._fetch_async(targets)))
+    
+    def _fetch_threaded(self, targets):
+        """Request all targets concurrently on a thread pool"""
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_CHECKS, len(targets))) as executor:
+            return list(executor.map(self._perform_http, targets))
+    
+    async def _fetch_async(self, targets):
+        """Request all targets concurrently as coroutines on one session"""
+        import aiohttp
+        
+        # Same limits as the threaded path: bounded connections, DNS cached for the TTL
+        connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_CHECKS, ttl_dns_cache=DNS_CACHE_TTL)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await asyncio.gather(*(self._acheck(t, session) for t in targets))
+    
+    def _run_cycle(self, fetch):
+        """Fetch results for all active targets, then record and act on them"""
         self.db.connect()
         targets = self.db.get_active_targets()
         
         if not targets:
-            print("No active targets configured.")
+            logger.info("No active targets configured.")
             return
         
-        print(f"\n=== Website Watchdog - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+        logger.info("\n=== Website Watchdog - %s ===\n", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
-        for target in targets:
-            result = self.check_target(target)
-            self.handle_result(result)
+        # Requests are I/O-bound: run them concurrently, then write serially
+        results = fetch(targets)
         
-        print(f"\n=== Check complete ===\n")
+        # One transaction (and one WAL sync) per cycle, not per write.
+        # Alerts wait for the commit: no network I/O under the write lock,
+        # and a rolled-back cycle has sent nothing it would resend
+        alerts = []
+        with self.db.batch():
+            open_ids = self.db.get_targets_with_open_incidents()
+            for result in results:
+                self._persist_result(result)
+                self.handle_result(result, open_ids, alerts)
+            
+            self._cycles_since_prune += 1
+            if self._cycles_since_prune >= PRUNE_EVERY:
+                self._cycles_since_prune = 0
+                pruned = self.db.prune_checks()
+                if pruned:
+                    logger.info("Pruned %s checks older than %s days", pruned, CHECK_RETENTION_DAYS)
+        
+        for send, args in alerts:
+            try:
+                send(*args)
+            except Exception as e:
+                logger.error("  → Alert error: %s", e)
+        
+        # Slack alerts are sent in the background; let them finish
+        self.alerter.flush()
+        
+        logger.info("\n=== Check complete ===\n")
+        
+        # One flush per cycle, so output still lands promptly from long-running loops
+        for handler in logger.handlers:
+            handler.flush()
+
+
+def _configure_logging():
+    """Send watchdog (and alerter) records to stdout, unless logging is already set up"""
+    if logger.hasHandlers():
+        # Configured by the embedding application (or an earlier call)
+        return
+    handler = BufferedStreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
 
 
 def main():
@@ -304,16 +777,19 @@ def main():
     command = sys.argv[1] if len(sys.argv) > 1 else "check"
     
     if command == "init":
-        print("Initializing watchdog...")
+        logger.info("Initializing watchdog...")
         watchdog.init()
-        print("✓ Watchdog initialized successfully")
+        logger.info("✓ Watchdog initialized successfully")
         
     elif command == "check":
         watchdog.run_checks()
         
+    elif command == "check-async":
+        watchdog.run_checks_async()
+        
     else:
-        print(f"Unknown command: {command}")
-        print("Usage: watchdog.py [init|check]")
+        logger.error("Unknown command: %s", command)
+        logger.error("Usage: watchdog.py [init|check|check-async]")
         sys.exit(1)
 
 